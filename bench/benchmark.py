@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# End-to-end benchmark of gitlab-cli commands against the local mock server.
+# For every command the median wall time, the number of requests, the bytes
+# transferred and the TCP connections opened are reported. A command that exits
+# with an error is flagged with its stderr and makes the run exit with 1, so a
+# crash never passes for a fast result. Use --cli to point
+# at another checkout of gitlab-cli.py and compare versions, --json to keep the
+# numbers for later runs.
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import mockserver
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CLI = os.path.join(ROOT, "src", "gitlab-cli.py")
+
+# name, arguments, stdin for interactive commands
+COMMANDS = [
+    ("board", ["board"], None),
+    ("board -list", ["board", "-list=List1"], None),
+    ("issue -d", ["issue", "42", "-d=1"], None),
+    ("mr list", ["mr"], None),
+    ("mr review", ["mr", "57"], "n\n" * 200),
+    ("pipes", ["pipes", "-n=50"], None),
+    ("branches", ["branches"], None),
+    ("move", ["move", "3", "List3", "List4", "-u=user2"], None),
+    ("lab", ["lab", "add", "4", "Frontend"], None),
+]
+
+
+def writeConfig(port, cacheDir = None, extra = None):
+    config = {"access-token": "benchmark-token",
+              "host": "http://127.0.0.1:{}".format(port),
+              "api-version": "v4",
+              "project-id": mockserver.PROJECT_ID}
+    if cacheDir is not None:
+        config["cache-dir"] = cacheDir
+    config.update(extra or {})
+    handle, path = tempfile.mkstemp(suffix = ".json")
+    with os.fdopen(handle, "w") as file:
+        json.dump(config, file)
+    return path
+
+
+def serverCall(port, path):
+    with urllib.request.urlopen("http://127.0.0.1:{}{}".format(port, path)) as answer:
+        return json.loads(answer.read())
+
+
+def runCommand(cli, configPath, command, stdin = None, extra = []):
+    # returns the wall time, the exit status and the stderr of the command, or
+    # the end of its output when stderr is empty
+    env = dict(os.environ)
+    env["GITLAB_CONFIG"] = configPath
+    start = time.perf_counter()
+    answer = subprocess.run([sys.executable, cli] + command + extra, env = env, input = stdin, text = True,
+                            stdout = subprocess.PIPE, stderr = subprocess.PIPE, check = False)
+    return time.perf_counter() - start, answer.returncode, answer.stderr or answer.stdout[-2000:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "gitlab-cli end-to-end benchmark")
+    parser.add_argument("--cli", default = DEFAULT_CLI, help = "path of the gitlab-cli.py to benchmark")
+    parser.add_argument("--repeat", type = int, default = 3)
+    parser.add_argument("--warm", action = "store_true", help = "keep the response cache between the repetitions")
+    parser.add_argument("--only", action = "append", help = "run only the named command, can be repeated")
+    parser.add_argument("--json", help = "write the results to this file")
+    parser.add_argument("extra", nargs = "*", help = "arguments added to every command, e.g. --engine=async")
+    mockserver.addArguments(parser)
+    args = parser.parse_args()
+
+    server = mockserver.startServer(latency = args.latency, handshake = args.handshake, jitter = args.jitter,
+                                    bandwidth = args.bandwidth, data = mockserver.dataFromArguments(args),
+                                    errorRate = args.error_rate, rateLimit = args.rate_limit, rateWindow = args.rate_window)
+    port = server.server_address[1]
+    cacheDir = tempfile.mkdtemp()
+    configPath = writeConfig(port, cacheDir)
+    results = []
+    failures = []
+    try:
+        print("{:<14} {:>10} {:>9} {:>12} {:>12}  {}".format("command", "median s", "requests", "bytes", "connections", "exit"))
+        for name, command, stdin in COMMANDS:
+            if args.only and name not in args.only:
+                continue
+            times = []
+            exitCode = 0
+            for i in range(args.repeat):
+                if not args.warm:
+                    shutil.rmtree(cacheDir, ignore_errors = True)
+                # every repetition starts from the same data
+                server.data = mockserver.dataFromArguments(args)
+                serverCall(port, "/__reset")
+                seconds, code, stderr = runCommand(args.cli, configPath, command, stdin, args.extra)
+                times.append(seconds)
+                if code != 0 and exitCode == 0:
+                    exitCode = code
+                    failures.append((name, code, stderr))
+            stats = serverCall(port, "/__stats")
+            result = {"command": name, "median": statistics.median(times), "requests": stats["requests"],
+                      "bytes": stats["bytes"], "connections": stats["connections"], "exit": exitCode}
+            results.append(result)
+            print("{:<14} {:>10.3f} {:>9} {:>12} {:>12}  {}".format(name, result["median"], result["requests"], result["bytes"],
+                                                                  result["connections"], "FAILED {}".format(exitCode) if exitCode else "ok"))
+    finally:
+        os.remove(configPath)
+        shutil.rmtree(cacheDir, ignore_errors = True)
+        server.shutdown()
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"cli": args.cli, "latency": args.latency, "results": results}, file, indent = 2)
+
+    for name, code, stderr in failures:
+        print("\n{} exited with {}:\n{}".format(name, code, stderr.strip()[-2000:]), file = sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Checks that the GraphQL board backend needs at most two requests whatever the
+# number of board lists: one query for boards, lists and first issue pages, and
+# the project path lookup when project-path is not configured. The REST backend
+# is measured next to it. Exits with 1 when a GraphQL run needs more requests.
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+import benchmark
+import mockserver
+
+# lists, issues; every list stays within one GraphQL page of 100 issues
+SIZES = [(2, 100), (8, 600), (32, 2400), (128, 9000)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "request count of the board command per backend")
+    parser.add_argument("--cli", default = benchmark.DEFAULT_CLI, help = "path of the gitlab-cli.py to check")
+    args = parser.parse_args()
+
+    failed = False
+    print("{:>6} {:>7} {:>14} {:>14} {:>14}".format("lists", "issues", "rest", "graphql", "graphql+lookup"))
+    for lists, issues in SIZES:
+        server = mockserver.startServer(data = mockserver.MockData(issues = issues, lists = lists, pipelines = 0, mergeRequests = 0, branches = 0))
+        port = server.server_address[1]
+        counts = []
+        try:
+            for extra in [{}, {"board-backend": "graphql", "project-path": mockserver.PROJECT_PATH}, {"board-backend": "graphql"}]:
+                cacheDir = tempfile.mkdtemp()
+                configPath = benchmark.writeConfig(port, cacheDir, extra)
+                benchmark.serverCall(port, "/__reset")
+                benchmark.runCommand(args.cli, configPath, ["board"])
+                stats = benchmark.serverCall(port, "/__stats")
+                counts.append(stats["requests"])
+                if extra and stats.get("paths", {}).get("getIssues", 0) > 0:
+                    # REST fallback was used
+                    counts[-1] = -stats["requests"]
+                os.remove(configPath)
+                shutil.rmtree(cacheDir, ignore_errors = True)
+        finally:
+            server.shutdown()
+        print("{:>6} {:>7} {:>14} {:>14} {:>14}".format(lists, issues, *counts))
+        failed = failed or not all(1 <= count <= 2 for count in counts[1:])
+    if failed:
+        print("GraphQL board needed more than two requests (negative: fell back to REST)")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
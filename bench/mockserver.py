@@ -0,0 +1,627 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Local stand-in for the parts of the GitLab REST API used by gitlab-cli.
+# Start it standalone (python3 bench/mockserver.py --port 8080) or embed it
+# with startServer() as the benchmarks do. The data is generated with realistic
+# volumes and shapes: thousands of issues with full nested objects, boards,
+# notes, merge requests with discussions, pipelines and branches. The boards can
+# also be read through a minimal GraphQL endpoint, see Handler.postGraphql.
+
+import argparse
+import base64
+import datetime
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PROJECT_ID = 1
+PROJECT_PATH = "group/project"
+GRAPHQL_PATH = "/api/graphql"
+API_PREFIX = "/api/v4/projects/{}".format(PROJECT_ID)
+# projects 1..MockData.projects serve the same data, group GROUP_ID contains them all
+PROJECT_PATTERN = r"/api/v4/projects/(\d+)"
+GROUP_ID = 7
+WEB_URL = "https://gitlab.example.com/group/project"
+EPOCH = datetime.datetime(2026, 1, 1, tzinfo = datetime.timezone.utc)
+
+
+def timestamp(hours):
+    return (EPOCH + datetime.timedelta(hours = hours)).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def now():
+    return datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+class MockData(object):
+
+    def __init__(self, issues = 3000, lists = 8, pipelines = 2000, mergeRequests = 150, branches = 300, users = 40, projects = 1):
+        self.lock = threading.Lock()
+        self.projects = [{"id": projectId, "name": "project{}".format(projectId), "path": "project{}".format(projectId),
+                          "path_with_namespace": "group/project{}".format(projectId), "archived": False}
+                         for projectId in range(1, projects + 1)]
+        self.listLabels = ["List{}".format(i) for i in range(lists)]
+        self.otherLabels = ["Backend", "Frontend", "Bug", "Feature", "Ready", "Docs"]
+        self.users = [self._user(userId) for userId in range(1, users + 1)]
+        self.boards = [{"id": 1, "name": "Development",
+                        "lists": [{"id": i, "label": self._label(name), "position": i} for i, name in enumerate(self.listLabels)]}]
+        # newest first, like GitLab's default created_at/desc order
+        self.issues = {}
+        for iid in range(issues, 0, -1):
+            self.issues[iid] = self._issue(iid)
+        self.notes = {}
+        self.mergeRequests = {}
+        for iid in range(mergeRequests, 0, -1):
+            self.mergeRequests[iid] = self._mergeRequest(iid)
+        self.discussions = {}
+        self.pipelines = [self._pipeline(pipelineId) for pipelineId in range(pipelines, 0, -1)]
+        self.branches = [self._branch(index) for index in range(branches)]
+        self.nextId = 100000
+
+    def newId(self):
+        self.nextId += 1
+        return self.nextId
+
+    def _user(self, userId):
+        return {"id": userId, "username": "user{}".format(userId), "name": "User {}".format(userId), "state": "active",
+                "avatar_url": "https://secure.gravatar.com/avatar/{}?s=80&d=identicon".format(hashlib.md5(str(userId).encode()).hexdigest()),
+                "web_url": "https://gitlab.example.com/user{}".format(userId)}
+
+    def _label(self, name):
+        return {"id": abs(hash(name)) % 10000, "name": name, "color": "#428BCA", "description": None, "text_color": "#FFFFFF"}
+
+    def _issue(self, iid):
+        user = self.users[iid % len(self.users)]
+        author = self.users[(iid * 7) % len(self.users)]
+        labels = [self.listLabels[iid % len(self.listLabels)], self.otherLabels[iid % len(self.otherLabels)]]
+        return {"id": 1000 + iid, "iid": iid, "project_id": PROJECT_ID,
+                "title": "Issue number {} about {}".format(iid, labels[1].lower()),
+                "description": "Description of issue {}. ".format(iid) * 8,
+                "state": "opened" if iid % 10 != 0 else "closed",
+                "created_at": timestamp(iid), "updated_at": timestamp(iid + 1), "closed_at": None, "closed_by": None,
+                "labels": labels,
+                "milestone": {"id": 7, "iid": 3, "project_id": PROJECT_ID, "title": "Sprint 42", "description": "",
+                              "state": "active", "created_at": timestamp(0), "updated_at": timestamp(0),
+                              "due_date": "2026-12-31", "start_date": "2026-12-01", "web_url": WEB_URL + "/-/milestones/3"},
+                "assignee": user, "assignees": [user], "author": author,
+                "type": "ISSUE", "user_notes_count": iid % 12, "merge_requests_count": 0, "upvotes": iid % 3, "downvotes": 0,
+                "due_date": None, "confidential": False, "discussion_locked": None, "issue_type": "issue",
+                "web_url": WEB_URL + "/-/issues/{}".format(iid),
+                "time_stats": {"time_estimate": 0, "total_time_spent": 0, "human_time_estimate": None, "human_total_time_spent": None},
+                "task_completion_status": {"count": 0, "completed_count": 0},
+                "references": {"short": "#{}".format(iid), "relative": "#{}".format(iid), "full": "group/project#{}".format(iid)},
+                "severity": "UNKNOWN", "_links": {"self": "https://gitlab.example.com/api/v4/projects/1/issues/{}".format(iid),
+                                                   "notes": "https://gitlab.example.com/api/v4/projects/1/issues/{}/notes".format(iid)}}
+
+    def _note(self, noteId, hours, body, resolvable = False, resolved = False):
+        author = self.users[noteId % len(self.users)]
+        note = {"id": noteId, "type": "DiscussionNote" if resolvable else None, "body": body, "attachment": None,
+                "author": author, "created_at": timestamp(hours), "updated_at": timestamp(hours), "system": False,
+                "noteable_type": "Issue", "resolvable": resolvable, "confidential": False, "internal": False}
+        if resolvable:
+            note["resolved"] = resolved
+            note["resolved_by"] = author if resolved else None
+        return note
+
+    def issueNotes(self, iid):
+        with self.lock:
+            if iid not in self.notes:
+                issue = self.issues[iid]
+                self.notes[iid] = [self._note(iid * 100 + index, iid + index, "Note {} on issue {}".format(index, iid))
+                                   for index in range(issue["user_notes_count"] * 3)]
+            return self.notes[iid]
+
+    def _mergeRequest(self, iid):
+        author = self.users[iid % len(self.users)]
+        return {"id": 5000 + iid, "iid": iid, "project_id": PROJECT_ID, "title": "Merge request {} for feature-{}".format(iid, iid % 7),
+                "description": "Implements feature {}.\n\nCloses #{}".format(iid, iid), "state": "opened" if iid % 4 != 0 else "merged",
+                "created_at": timestamp(iid * 3), "updated_at": timestamp(iid * 3 + 2),
+                "source_branch": "feature-{}".format(iid), "target_branch": "main", "author": author, "assignee": author,
+                "assignees": [author], "reviewers": [self.users[(iid + 1) % len(self.users)]],
+                "upvotes": iid % 3, "downvotes": 0, "user_notes_count": iid % 20, "work_in_progress": iid % 5 == 0,
+                "draft": iid % 5 == 0, "merge_status": "can_be_merged", "detailed_merge_status": "mergeable",
+                "sha": "{:040x}".format(iid), "labels": ["Backend"], "web_url": WEB_URL + "/-/merge_requests/{}".format(iid),
+                "references": {"short": "!{}".format(iid), "relative": "!{}".format(iid), "full": "group/project!{}".format(iid)}}
+
+    def mergeRequestDiscussions(self, iid):
+        with self.lock:
+            if iid not in self.discussions:
+                discussions = []
+                for index in range(iid % 60 + 5):
+                    resolvable = index % 3 != 0
+                    notes = [self._note(iid * 1000 + index * 10 + n, iid * 3 + index, "Review comment {}.{} :thumbsup:".format(index, n),
+                                        resolvable, resolved = index % 2 == 0) for n in range(index % 4 + 1)]
+                    discussions.append({"id": "{:040x}".format(iid * 1000 + index), "individual_note": not resolvable, "notes": notes})
+                self.discussions[iid] = discussions
+            return self.discussions[iid]
+
+    def _pipeline(self, pipelineId):
+        status = ["success", "failed", "running", "canceled", "success", "pending"][pipelineId % 6]
+        return {"id": pipelineId, "iid": pipelineId, "project_id": PROJECT_ID, "status": status, "source": "push",
+                "ref": "feature-{}".format(pipelineId % 7), "sha": "{:040x}".format(pipelineId),
+                "created_at": timestamp(pipelineId), "updated_at": timestamp(pipelineId + 1),
+                "web_url": WEB_URL + "/-/pipelines/{}".format(pipelineId)}
+
+    def _branch(self, index):
+        author = self.users[index % len(self.users)]
+        return {"name": "feature-{}".format(index), "merged": index % 3 == 0, "protected": index == 0, "default": index == 0,
+                "developers_can_push": False, "developers_can_merge": False, "can_push": True,
+                "web_url": WEB_URL + "/-/tree/feature-{}".format(index),
+                "commit": {"id": "{:040x}".format(index), "short_id": "{:08x}".format(index), "title": "Commit on feature {}".format(index),
+                           "message": "Commit on feature {}\n".format(index), "author_name": author["name"],
+                           "author_email": "{}@example.com".format(author["username"]), "authored_date": timestamp(index),
+                           "committer_name": author["name"], "committed_date": timestamp(index), "created_at": timestamp(index),
+                           "parent_ids": ["{:040x}".format(index + 1)], "web_url": WEB_URL + "/-/commit/{:040x}".format(index)}}
+
+
+class Stats(object):
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.connections = 0
+        self.requests = 0
+        self.bytesSent = 0
+        self.paths = {}
+        self.throttled = 0
+        self.errors = 0
+
+    def snapshot(self):
+        with self.lock:
+            return {"connections": self.connections, "requests": self.requests, "bytes": self.bytesSent, "paths": dict(self.paths),
+                    "throttled": self.throttled, "errors": self.errors}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        stats = self.server.stats
+        with stats.lock:
+            stats.connections += 1
+        # Simulates TCP + TLS handshake cost of a fresh connection
+        if self.server.handshake > 0:
+            time.sleep(self.server.handshake)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method):
+        url = urllib.parse.urlsplit(self.path)
+        query = dict(urllib.parse.parse_qsl(url.query))
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length).decode("utf-8") if length > 0 else ""
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            body = json.loads(body)
+        elif body != "":
+            query.update(urllib.parse.parse_qsl(body))
+
+        if url.path.startswith("/__"):
+            # Control calls come over their own connection, keep it out of the numbers
+            with self.server.stats.lock:
+                self.server.stats.connections -= 1
+        if url.path == "/__stats":
+            return self._send(200, self.server.stats.snapshot(), count = False)
+        if url.path == "/__reset":
+            self.server.stats.reset()
+            return self._send(200, {}, count = False)
+
+        self.server.delay()
+
+        self.rateHeaders = {}
+        if self.server.rateLimit > 0:
+            # like GitLab: a fixed window per client, 429 with Retry-After once it is used up
+            limited, self.rateHeaders = self.server.limit()
+            if limited:
+                with self.server.stats.lock:
+                    self.server.stats.throttled += 1
+                return self._send(429, {"message": "Retry later"}, {"Retry-After": self.rateHeaders["RateLimit-Reset"] - int(time.time())})
+        if random.random() < self.server.errorRate:
+            with self.server.stats.lock:
+                self.server.stats.errors += 1
+            return self._send(503, {"message": "503 Service Unavailable"})
+
+        if url.path == GRAPHQL_PATH and method == "POST":
+            with self.server.stats.lock:
+                self.server.stats.paths["postGraphql"] = self.server.stats.paths.get("postGraphql", 0) + 1
+            return self.postGraphql(body)
+        if url.path == "/api/v4/groups/{}/projects".format(GROUP_ID) and method == "GET":
+            return self._sendPage(query, self.server.data.projects)
+        if url.path == "/api/v4/users" and method == "GET":
+            with self.server.stats.lock:
+                self.server.stats.paths["getInstanceUsers"] = self.server.stats.paths.get("getInstanceUsers", 0) + 1
+            return self.getInstanceUsers(query)
+        project = re.match(PROJECT_PATTERN, url.path)
+        if project is None or not 1 <= int(project.group(1)) <= len(self.server.data.projects):
+            return self._send(404, {"message": "404 Project Not Found"})
+        path = url.path[project.end():]
+        for pattern, handlerMethod, name in ROUTES:
+            match = re.fullmatch(pattern, path)
+            if match and handlerMethod == method:
+                with self.server.stats.lock:
+                    self.server.stats.paths[name] = self.server.stats.paths.get(name, 0) + 1
+                return getattr(self, name)(query, *match.groups())
+        return self._send(404, {"message": "404 Not Found"})
+
+    def _send(self, status, body, headers = None, count = True):
+        payload = json.dumps(body).encode("utf-8")
+        headers = dict(getattr(self, "rateHeaders", {}), **(headers or {}))
+        if self.command == "GET" and status == 200 and count:
+            etag = 'W/"{}"'.format(hashlib.md5(payload).hexdigest())
+            headers["ETag"] = etag
+            if self.headers.get("If-None-Match") == etag:
+                status = 304
+                payload = b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in headers.items():
+            self.send_header(key, str(value))
+        self.end_headers()
+        self.server.transfer(len(payload))
+        self.wfile.write(payload)
+        if count:
+            stats = self.server.stats
+            with stats.lock:
+                stats.requests += 1
+                stats.bytesSent += len(payload)
+
+    def _sendPage(self, query, elements):
+        perPage = min(int(query.get("per_page", 20)), 100)
+        page = int(query.get("page", 1))
+        totalPages = max(1, (len(elements) + perPage - 1) // perPage)
+        start = (page - 1) * perPage
+        headers = {"X-Page": page, "X-Per-Page": perPage,
+                   "X-Next-Page": page + 1 if page < totalPages else "",
+                   "X-Prev-Page": page - 1 if page > 1 else ""}
+        # Like GitLab, totals are left out for very large collections
+        if len(elements) <= 10000:
+            headers["X-Total"] = len(elements)
+            headers["X-Total-Pages"] = totalPages
+        if page < totalPages:
+            nextQuery = dict(query, page = page + 1)
+            headers["Link"] = '<{}{}?{}>; rel="next"'.format(self.server.baseUrl(), urllib.parse.urlsplit(self.path).path,
+                                                             urllib.parse.urlencode(nextQuery))
+        self._send(200, elements[start:start + perPage], headers)
+
+    def _notFound(self):
+        self._send(404, {"message": "404 Not found"})
+
+    def _user(self, query):
+        return self.server.data.users[0]
+
+    def getProject(self, query):
+        self._send(200, {"id": PROJECT_ID, "name": "project", "path": "project", "path_with_namespace": PROJECT_PATH,
+                         "web_url": WEB_URL, "default_branch": "main"})
+
+    def getBoards(self, query):
+        self._send(200, self.server.data.boards)
+
+    def postGraphql(self, body):
+        # Not a GraphQL implementation: the two operations gitlab-cli sends are
+        # recognised by operationName and answered from the variables. A list of
+        # operations is answered with a list, like GitLab's multiplexing.
+        operations = body if isinstance(body, list) else [body]
+        results = []
+        for operation in operations:
+            resolver = getattr(self, "_graphql_" + str(operation.get("operationName")), None)
+            if resolver is None:
+                results.append({"errors": [{"message": "unknown operation {}".format(operation.get("operationName"))}]})
+            else:
+                results.append({"data": resolver(operation.get("variables") or {})})
+        self._send(200, results if isinstance(body, list) else results[0])
+
+    def _graphql_boardSnapshot(self, variables):
+        if variables.get("fullPath") != PROJECT_PATH:
+            return {"project": None}
+        boards = []
+        for board in self.server.data.boards:
+            lists = [{"id": "gid://gitlab/List/{}".format(boardList["id"]), "listType": "label",
+                      "label": {"title": boardList["label"]["name"]},
+                      "issues": self._graphqlIssues(boardList["label"]["name"], variables["first"], None)} for boardList in board["lists"]]
+            boards.append({"id": "gid://gitlab/Board/{}".format(board["id"]), "name": board["name"], "lists": {"nodes": lists}})
+        return {"project": {"boards": {"nodes": boards}}}
+
+    def _graphql_boardListIssues(self, variables):
+        listId = int(variables["id"].rsplit("/", 1)[-1])
+        for board in self.server.data.boards:
+            for boardList in board["lists"]:
+                if boardList["id"] == listId:
+                    return {"boardList": {"issues": self._graphqlIssues(boardList["label"]["name"], variables["first"], variables.get("after"))}}
+        return {"boardList": None}
+
+    def _graphqlIssues(self, label, first, after):
+        issues = [i for i in self.server.data.issues.values() if i["state"] == "opened" and label in i["labels"]]
+        start = int(base64.b64decode(after).decode("ascii")) if after else 0
+        end = start + min(first, 100)
+        nodes = [{"id": "gid://gitlab/Issue/{}".format(issue["id"]), "iid": str(issue["iid"]), "title": issue["title"],
+                  "labels": {"nodes": [{"title": name} for name in issue["labels"]]},
+                  "assignees": {"nodes": [{"username": user["username"]} for user in issue["assignees"]]}} for issue in issues[start:end]]
+        cursor = base64.b64encode(str(end).encode("ascii")).decode("ascii")
+        return {"pageInfo": {"hasNextPage": end < len(issues), "endCursor": cursor}, "nodes": nodes}
+
+    def getIssues(self, query):
+        issues = list(self.server.data.issues.values())
+        if "labels" in query:
+            wanted = [l for l in query["labels"].split(",") if l]
+            issues = [i for i in issues if all(l in i["labels"] for l in wanted)]
+        if "state" in query:
+            issues = [i for i in issues if i["state"] == query["state"]]
+        if "updated_after" in query:
+            issues = [i for i in issues if i["updated_at"] > query["updated_after"]]
+        if "assignee_username" in query:
+            issues = [i for i in issues if i["assignee"] is not None and i["assignee"]["username"] == query["assignee_username"]]
+        self._sendPage(query, issues)
+
+    def getIssue(self, query, iid):
+        issue = self.server.data.issues.get(int(iid))
+        if issue is None:
+            return self._notFound()
+        self._send(200, issue)
+
+    def putIssue(self, query, iid):
+        data = self.server.data
+        with data.lock:
+            issue = data.issues.get(int(iid))
+            if issue is None:
+                return self._notFound()
+            if "labels" in query:
+                issue["labels"] = [l for l in query["labels"].split(",") if l]
+            for label in [l for l in query.get("add_labels", "").split(",") if l]:
+                if label not in issue["labels"]:
+                    issue["labels"].append(label)
+            for label in [l for l in query.get("remove_labels", "").split(",") if l]:
+                if label in issue["labels"]:
+                    issue["labels"].remove(label)
+            if "assignee_ids" in query:
+                users = [u for u in data.users if str(u["id"]) == query["assignee_ids"]]
+                issue["assignees"] = users
+                issue["assignee"] = users[0] if users else None
+            if query.get("state_event") == "close":
+                issue["state"] = "closed"
+            issue["updated_at"] = now()
+            self._send(200, issue)
+
+    def getIssueNotes(self, query, iid):
+        if int(iid) not in self.server.data.issues:
+            return self._notFound()
+        notes = self.server.data.issueNotes(int(iid))
+        if query.get("sort") != "asc":
+            notes = list(reversed(notes))
+        self._sendPage(query, notes)
+
+    def postIssueNote(self, query, iid):
+        data = self.server.data
+        if int(iid) not in data.issues:
+            return self._notFound()
+        notes = data.issueNotes(int(iid))
+        with data.lock:
+            note = data._note(data.newId(), 0, query.get("body", ""))
+            note["author"] = self._user(query)
+            note["created_at"] = note["updated_at"] = now()
+            notes.append(note)
+            data.issues[int(iid)]["updated_at"] = now()
+        self._send(201, note)
+
+    def getMergeRequests(self, query):
+        mergeRequests = list(self.server.data.mergeRequests.values())
+        if "state" in query:
+            mergeRequests = [mr for mr in mergeRequests if mr["state"] == query["state"]]
+        if "updated_after" in query:
+            mergeRequests = [mr for mr in mergeRequests if mr["updated_at"] > query["updated_after"]]
+        self._sendPage(query, mergeRequests)
+
+    def getMergeRequest(self, query, iid):
+        mergeRequest = self.server.data.mergeRequests.get(int(iid))
+        if mergeRequest is None:
+            return self._notFound()
+        self._send(200, mergeRequest)
+
+    def getMergeRequestNotes(self, query, iid):
+        if int(iid) not in self.server.data.mergeRequests:
+            return self._notFound()
+        notes = [note for discussion in self.server.data.mergeRequestDiscussions(int(iid)) for note in discussion["notes"]]
+        self._sendPage(query, notes)
+
+    def getDiscussions(self, query, iid):
+        if int(iid) not in self.server.data.mergeRequests:
+            return self._notFound()
+        self._sendPage(query, self.server.data.mergeRequestDiscussions(int(iid)))
+
+    def _discussion(self, iid, discussionId):
+        if int(iid) not in self.server.data.mergeRequests:
+            return None
+        for discussion in self.server.data.mergeRequestDiscussions(int(iid)):
+            if discussion["id"] == discussionId:
+                return discussion
+        return None
+
+    def getDiscussion(self, query, iid, discussionId):
+        discussion = self._discussion(iid, discussionId)
+        if discussion is None:
+            return self._notFound()
+        self._send(200, discussion)
+
+    def postDiscussionNote(self, query, iid, discussionId):
+        data = self.server.data
+        discussion = self._discussion(iid, discussionId)
+        if discussion is None:
+            return self._notFound()
+        with data.lock:
+            resolvable = discussion["notes"][0]["resolvable"]
+            note = data._note(data.newId(), 0, query.get("body", ""), resolvable, resolved = False)
+            note["author"] = self._user(query)
+            note["noteable_type"] = "MergeRequest"
+            note["created_at"] = note["updated_at"] = now()
+            discussion["notes"].append(note)
+            data.mergeRequests[int(iid)]["updated_at"] = now()
+        self._send(201, note)
+
+    def getPipelines(self, query):
+        pipelines = self.server.data.pipelines
+        if "username" in query:
+            userId = int(query["username"].replace("user", "") or 0)
+            pipelines = [p for p in pipelines if p["id"] % len(self.server.data.users) == userId % len(self.server.data.users)]
+        if "ref" in query:
+            pipelines = [p for p in pipelines if p["ref"] == query["ref"]]
+        if "status" in query:
+            pipelines = [p for p in pipelines if p["status"] == query["status"]]
+        if "updated_after" in query:
+            pipelines = [p for p in pipelines if p["updated_at"] > query["updated_after"]]
+        if query.get("sort") == "asc":
+            pipelines = list(reversed(pipelines))
+        self._sendPage(query, pipelines)
+
+    def getPipeline(self, query, pipelineId):
+        for pipeline in self.server.data.pipelines:
+            if pipeline["id"] == int(pipelineId):
+                # like GitLab only the single pipeline has its user, the same one the username filter matches
+                users = self.server.data.users
+                return self._send(200, dict(pipeline, user = users[(pipeline["id"] - 1) % len(users)]))
+        self._notFound()
+
+    def getBranches(self, query):
+        branches = self.server.data.branches
+        if "search" in query:
+            branches = [b for b in branches if query["search"] in b["name"]]
+        self._sendPage(query, branches)
+
+    def getMembers(self, query):
+        # every user but the last is a member, the last one is found through the instance /users only
+        members = [dict(u, access_level = 30) for u in self.server.data.users[:-1]]
+        self._sendPage(query, members)
+
+    def getUsers(self, query):
+        # project users: the members, filtered by search only like GitLab
+        users = [u for u in self.server.data.users[:-1] if query.get("search", "") in u["username"]]
+        self._sendPage(query, users)
+
+    def getInstanceUsers(self, query):
+        users = [u for u in self.server.data.users if u["username"] == query.get("username", u["username"])]
+        self._sendPage(query, users)
+
+
+ROUTES = [
+    (r"", "GET", "getProject"),
+    (r"/boards", "GET", "getBoards"),
+    (r"/issues", "GET", "getIssues"),
+    (r"/issues/(\d+)", "GET", "getIssue"),
+    (r"/issues/(\d+)", "PUT", "putIssue"),
+    (r"/issues/(\d+)/notes", "GET", "getIssueNotes"),
+    (r"/issues/(\d+)/notes", "POST", "postIssueNote"),
+    (r"/merge_requests", "GET", "getMergeRequests"),
+    (r"/merge_requests/(\d+)", "GET", "getMergeRequest"),
+    (r"/merge_requests/(\d+)/notes", "GET", "getMergeRequestNotes"),
+    (r"/merge_requests/(\d+)/discussions", "GET", "getDiscussions"),
+    (r"/merge_requests/(\d+)/discussions/(\w+)", "GET", "getDiscussion"),
+    (r"/merge_requests/(\d+)/discussions/(\w+)/notes", "POST", "postDiscussionNote"),
+    (r"/pipelines", "GET", "getPipelines"),
+    (r"/pipelines/(\d+)", "GET", "getPipeline"),
+    (r"/repository/branches", "GET", "getBranches"),
+    (r"/members/all", "GET", "getMembers"),
+    (r"/users", "GET", "getUsers"),
+]
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, data, latency = 0.0, handshake = 0.0, jitter = 0.0, bandwidth = 0, errorRate = 0.0,
+                 rateLimit = 0, rateWindow = 60):
+        super().__init__(address, Handler)
+        self.data = data
+        self.latency = latency
+        self.handshake = handshake
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.errorRate = errorRate
+        self.rateLimit = rateLimit
+        self.rateWindow = rateWindow
+        self.windowStart = 0
+        self.windowUsed = 0
+        self.rateLock = threading.Lock()
+        self.stats = Stats()
+
+    def limit(self):
+        # returns whether the request is over the limit and the RateLimit headers
+        with self.rateLock:
+            now = time.time()
+            if now >= self.windowStart + self.rateWindow:
+                self.windowStart = now
+                self.windowUsed = 0
+            self.windowUsed += 1
+            reset = int(self.windowStart + self.rateWindow) + 1
+            headers = {"RateLimit-Limit": self.rateLimit, "RateLimit-Remaining": max(self.rateLimit - self.windowUsed, 0),
+                       "RateLimit-Reset": reset}
+            return self.windowUsed > self.rateLimit, headers
+
+    def baseUrl(self):
+        return "http://127.0.0.1:{}".format(self.server_address[1])
+
+    def delay(self):
+        # time to first byte of every request
+        latency = self.latency + random.uniform(0, self.jitter)
+        if latency > 0:
+            time.sleep(latency)
+
+    def transfer(self, size):
+        # bytes per second of the simulated link, 0 is unlimited
+        if self.bandwidth > 0:
+            time.sleep(size / float(self.bandwidth))
+
+
+def startServer(port = 0, latency = 0.0, handshake = 0.0, data = None, jitter = 0.0, bandwidth = 0, errorRate = 0.0,
+                rateLimit = 0, rateWindow = 60):
+    server = MockServer(("127.0.0.1", port), data or MockData(), latency, handshake, jitter, bandwidth, errorRate, rateLimit, rateWindow)
+    thread = threading.Thread(target = server.serve_forever, daemon = True)
+    thread.start()
+    return server
+
+
+def addArguments(parser):
+    parser.add_argument("--latency", type = float, default = 0.0, help = "seconds added to every request")
+    parser.add_argument("--jitter", type = float, default = 0.0, help = "random seconds added on top of the latency")
+    parser.add_argument("--handshake", type = float, default = 0.0, help = "seconds added to every new connection")
+    parser.add_argument("--bandwidth", type = int, default = 0, help = "bytes per second of the link, 0 is unlimited")
+    parser.add_argument("--error-rate", type = float, default = 0.0, help = "share of requests answered with 503")
+    parser.add_argument("--rate-limit", type = int, default = 0, help = "requests per window, then 429, 0 is unlimited")
+    parser.add_argument("--rate-window", type = int, default = 60, help = "seconds of the rate limit window")
+    parser.add_argument("--issues", type = int, default = 3000)
+    parser.add_argument("--lists", type = int, default = 8, help = "lists of the board")
+    parser.add_argument("--projects", type = int, default = 1, help = "projects of the group, all with the same data")
+    parser.add_argument("--pipelines", type = int, default = 2000)
+    parser.add_argument("--merge-requests", type = int, default = 150)
+    parser.add_argument("--branches", type = int, default = 300)
+
+
+def dataFromArguments(args):
+    return MockData(issues = args.issues, lists = args.lists, projects = args.projects, pipelines = args.pipelines, mergeRequests = args.merge_requests, branches = args.branches)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Local stand-in GitLab API")
+    parser.add_argument("--port", type = int, default = 8080)
+    addArguments(parser)
+    args = parser.parse_args()
+    server = MockServer(("127.0.0.1", args.port), dataFromArguments(args), args.latency, args.handshake, args.jitter, args.bandwidth,
+                        args.error_rate, args.rate_limit, args.rate_window)
+    print("Mock GitLab listening on http://127.0.0.1:{}".format(server.server_address[1]))
+    server.serve_forever()
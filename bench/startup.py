@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Tracks the startup cost of gitlab-cli: for every command the wall time and the
+# time spent importing modules (python -X importtime) are reported. The
+# interpreter alone is measured as reference.
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import benchmark
+import mockserver
+
+COMMANDS = [
+    ["help"],
+    ["lab", "add", "4", "Frontend"],
+    ["move", "3", "List0", "List1"],
+    ["issue", "3"],
+    ["pipes", "-n=5"],
+    ["board"],
+]
+
+
+def importTime(stderr):
+    # lines look like "import time:   self [us] | cumulative | name", top level
+    # modules are not indented, their cumulative time covers everything below
+    total = 0
+    modules = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_, cumulative, name = line[len("import time:"):].split("|")
+        modules += 1
+        if not name.startswith("  "):
+            total += int(cumulative)
+    return total / 1000.0, modules
+
+
+def measure(arguments, env):
+    start = time.perf_counter()
+    answer = subprocess.run([sys.executable, "-X", "importtime"] + arguments, env = env, stdout = subprocess.DEVNULL,
+                            stderr = subprocess.PIPE, text = True, check = False)
+    wall = (time.perf_counter() - start) * 1000.0
+    if answer.returncode != 0:
+        # stderr holds the import times, the error is at its end
+        raise SystemExit("{} exited with {}:\n{}".format(" ".join(arguments), answer.returncode, answer.stderr.strip()[-2000:]))
+    imports, modules = importTime(answer.stderr)
+    return wall, imports, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "gitlab-cli startup benchmark")
+    parser.add_argument("--cli", default = benchmark.DEFAULT_CLI, help = "path of the gitlab-cli.py to benchmark")
+    parser.add_argument("--repeat", type = int, default = 5)
+    args = parser.parse_args()
+
+    server = mockserver.startServer()
+    configPath = benchmark.writeConfig(server.server_address[1])
+    env = dict(os.environ)
+    env["GITLAB_CONFIG"] = configPath
+    try:
+        print("{:<30} {:>10} {:>10} {:>8}".format("command", "wall ms", "import ms", "modules"))
+        runs = [("(interpreter)", ["-c", "pass"])] + [(" ".join(command), [args.cli] + command) for command in COMMANDS]
+        for name, arguments in runs:
+            results = [measure(arguments, env) for i in range(args.repeat)]
+            print("{:<30} {:>10.1f} {:>10.1f} {:>8}".format(name, statistics.median([r[0] for r in results]),
+                                                           statistics.median([r[1] for r in results]), results[-1][2]))
+    finally:
+        os.remove(configPath)
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
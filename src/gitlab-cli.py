@@ -2,39 +2,200 @@
 # coding: utf-8
 
 
+# requests, tabulate, asyncio and concurrent.futures are imported where they are
+# used, "help" or a cached call should not pay for importing them.
 import os
-import requests 
-import urllib
-import datetime
 import sys
 import json
-import os
-import pdb
 import urllib.parse
-from tabulate import tabulate
+import itertools
+import hashlib
+import time
+import threading
 
 # Read configuration.json from environment variable GITLAB_CONFIG
 ENV_VARIABLE_NAME = "GITLAB_CONFIG"
 
 def main(args):
-    d = createDeligator()
-    d.translate(args)
-    
-def createDeligator():
-    configuration = Configuration()
-    requestFactory = RequestFactory(configuration)
-    resources = GitlabResources(configuration)
-    executor = GitLab(requestFactory, resources)
-
-    # init apis
-    apis = [BranchApi(), PipelineApi(), BoardApi(), IssueMoveApi(), IssueApi(), MergeRequestApi(), LabelsApi()]
-    address = "{}/api/{}/projects/{}".format(configuration.getHostAddress(),\
-            configuration.getApiVersion(),\
-            configuration.getProjectId())
-    for api in apis:
-        api.setup(address, requestFactory)
+    try:
+        if len(args) > 1 and args[1] == "daemon":
+            return Daemon.command(args[0], args[2:])
+        if Daemon.forward(args):
+            return
+        run(args)
+    except BrokenPipeError:
+        # the reader went away (| head), end quietly like a process killed by
+        # SIGPIPE; stdout points to devnull so the flush at exit cannot fail again
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        sys.exit(141)
+
+def run(args, shared = None):
+    options = Options(args)
+    tracer.enable(options.trace, options.traceFile)
+    printer.setFormat(options.format, options.fields)
+    d = createDeligator(options, shared)
+    try:
+        d.translate(options.args)
+    finally:
+        tracer.finish(options.args[1:])
     
-    return Command(executor, apis)
+def createDeligator(options, shared = None):
+    return Command(ApiRegistry(options, shared))
+
+
+def tabulate(rows, **kwargs):
+    from tabulate import tabulate as render
+    with tracer.rendering():
+        return render(rows, **kwargs)
+
+
+class ApiRegistry(object):
+
+    # Builds the configuration, the request factory and only the Api of the
+    # called command, on first use. The daemon passes the same shared dict to
+    # every call, so configuration and request factories (session, caches) are
+    # built once per daemon.
+
+    def __init__(self, options, shared = None):
+        self.options = options
+        self.shared = shared if shared is not None else {}
+        self._executer = None
+        # a kept factory must not answer this call with a PUT of an earlier one
+        for value in self.shared.values():
+            if isinstance(value, RequestFactory):
+                value.forgetMemo()
+
+    def configuration(self):
+        if "configuration" not in self.shared:
+            self.shared["configuration"] = Configuration()
+        return self.shared["configuration"]
+
+    def requestFactory(self):
+        configuration = self.configuration()
+        engine = self.options.engine or configuration.getEngine()
+        key = ("requestFactory", self.options.noCache, self.options.refresh, engine)
+        if key not in self.shared:
+            cache = None
+            if not self.options.noCache:
+                cache = ResponseCache(configuration, refresh = self.options.refresh)
+            if engine == "async":
+                self.shared[key] = AsyncRequestFactory(configuration, cache)
+            else:
+                self.shared[key] = RequestFactory(configuration, cache)
+        return self.shared[key]
+
+    def address(self):
+        configuration = self.configuration()
+        if configuration.getProjectId() is None:
+            # only a group configured, single project commands use its first project
+            return self.projects()[0][1]
+        return Utils.projectAddress(configuration, configuration.getProjectId())
+
+    def projects(self):
+        # [(name, address)] of every configured project, group projects included
+        key = ("projects", self.configuration().getGroupId())
+        if key not in self.shared:
+            configuration = self.configuration()
+            projects = [(str(projectId), Utils.projectAddress(configuration, projectId)) for projectId in configuration.getProjectIds()]
+            groupId = configuration.getGroupId()
+            if groupId is not None:
+                endpoint = "{}/groups/{}/projects?include_subgroups=true&archived=false&order_by=path&sort=asc&per_page={}".format(
+                    configuration.getApiAddress(), Utils.encodePath(groupId), Paginator.MAX_PER_PAGE)
+                known = set(address for name, address in projects)
+                for project in Paginator.fetchAll(self.requestFactory(), endpoint):
+                    address = Utils.projectAddress(configuration, project["id"])
+                    if address not in known:
+                        projects.append((project["path"], address))
+            self.shared[key] = projects
+        return self.shared[key]
+
+    def executer(self):
+        if self._executer is None:
+            self._executer = GitLab(self.requestFactory(), GitlabResources(self.configuration(), self.address()))
+        return self._executer
+
+    def mirror(self):
+        path = Mirror.path(self.configuration(), self.address())
+        if not os.path.exists(path):
+            return None
+        return Mirror(path)
+
+    def api(self, command):
+        for apiClass in API_CLASSES:
+            if apiClass._command == command:
+                mirror = None
+                if self.options.offline and apiClass.offline:
+                    mirror = self.mirror()
+                    if mirror is None:
+                        printer.out("No local mirror of the project, run sync first")
+                        sys.exit(1)
+                projects = None
+                if apiClass.fanOut and mirror is None:
+                    projects = self.projects()
+                    projects = projects if len(projects) > 1 else None
+                api = apiClass()
+                api.setup(self.address(), self.requestFactory(), mirror, projects)
+                return api
+        return None
+
+    def allApis(self):
+        # help only, these are not connected
+        apis = []
+        for apiClass in API_CLASSES:
+            api = apiClass()
+            api.setup(None, None)
+            apis.append(api)
+        return apis
+
+
+class GitlabError(Exception):
+    pass
+
+
+class Options(object):
+
+    # Global switches valid for every command, they are taken out of the
+    # arguments before the command is mapped.
+
+    def __init__(self, args):
+        self.noCache = False
+        self.refresh = False
+        self.engine = None
+        self.trace = False
+        self.traceFile = None
+        self.offline = False
+        self.format = None
+        self.fields = None
+        self.args = []
+        for arg in args:
+            if arg == "--no-cache":
+                self.noCache = True
+            elif arg == "--refresh":
+                self.refresh = True
+            elif arg.startswith("--engine="):
+                self.engine = arg.replace("--engine=", "")
+            elif arg == "--offline" or arg == "--local":
+                self.offline = True
+            elif arg == "--trace":
+                self.trace = True
+            elif arg.startswith("--trace-file="):
+                self.traceFile = arg.replace("--trace-file=", "")
+            elif arg.startswith("--format="):
+                self.format = arg.replace("--format=", "")
+            elif arg.startswith("--fields="):
+                self.fields = [field for field in arg.replace("--fields=", "").split(",") if field != ""]
+            else:
+                self.args.append(arg)
+
+    def inherit(self, options):
+        # a batch line keeps the switches of the batch call unless it sets its own
+        self.noCache = self.noCache or options.noCache
+        self.refresh = self.refresh or options.refresh
+        self.offline = self.offline or options.offline
+        self.engine = self.engine or options.engine
+        self.format = self.format or options.format
+        self.fields = self.fields if self.fields is not None else options.fields
 
 
 class Configuration(object):
@@ -48,7 +209,26 @@ class Configuration(object):
             self._accessToken = jFile["access-token"]
             self._gitlabHost = jFile["host"]
             self._apiVersion = jFile["api-version"]
-            self._projectId = jFile["project-id"]
+            # one id or path, or a list of them; group-id adds all projects of a group
+            projectIds = jFile.get("project-id")
+            if projectIds is None:
+                projectIds = []
+            self._projectIds = projectIds if isinstance(projectIds, list) else [projectIds]
+            self._groupId = jFile.get("group-id", None)
+            self._poolSize = jFile.get("pool-size", 10)
+            self._timeout = jFile.get("timeout", 30)
+            self._connectTimeout = jFile.get("connect-timeout", 5)
+            self._retries = jFile.get("retries", 3)
+            self._rateLimit = jFile.get("rate-limit", None)
+            self._concurrency = jFile.get("concurrency", 4)
+            self._cacheDir = jFile.get("cache-dir", os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "gitlab-cli"))
+            self._cacheSize = jFile.get("cache-size-mb", 50)
+            self._cacheTtl = jFile.get("cache-ttl", {})
+            self._boardTtl = jFile.get("board-ttl", 3600)
+            self._userTtl = jFile.get("user-ttl", 86400)
+            self._engine = jFile.get("engine", "sync")
+            self._boardBackend = jFile.get("board-backend", "rest")
+            self._projectPath = jFile.get("project-path", None)
             
     def getToken(self):
         return self._accessToken
@@ -60,7 +240,61 @@ class Configuration(object):
         return self._apiVersion
     
     def getProjectId(self):
-        return self._projectId
+        return self._projectIds[0] if len(self._projectIds) > 0 else None
+
+    def getProjectIds(self):
+        return self._projectIds
+
+    def getGroupId(self):
+        return self._groupId
+
+    def getApiAddress(self):
+        return "{}/api/{}".format(self._gitlabHost, self._apiVersion)
+
+    def getPoolSize(self):
+        return self._poolSize
+
+    def getTimeout(self):
+        return self._timeout
+
+    def getConnectTimeout(self):
+        return self._connectTimeout
+
+    def getRetries(self):
+        return self._retries
+
+    def getRateLimit(self):
+        return self._rateLimit
+
+    def getConcurrency(self):
+        return self._concurrency
+
+    def getCacheDir(self):
+        return self._cacheDir
+
+    def getCacheSize(self):
+        return self._cacheSize
+
+    def getCacheTtl(self):
+        return self._cacheTtl
+
+    def getBoardTtl(self):
+        return self._boardTtl
+
+    def getUserTtl(self):
+        return self._userTtl
+
+    def getEngine(self):
+        return self._engine
+
+    def getBoardBackend(self):
+        return self._boardBackend
+
+    def getProjectPath(self):
+        return self._projectPath
+
+    def getGraphqlAddress(self):
+        return "{}/api/graphql".format(self._gitlabHost)
 
 class Util(object):
 
@@ -75,14 +309,12 @@ class Util(object):
 
 class GitlabResources(object):
     
-    def __init__(self, configuration):
-        self.address = "{}/api/{}/projects/{}".format(configuration.getHostAddress(),\
-            configuration.getApiVersion(),\
-            configuration.getProjectId())
+    def __init__(self, configuration, address):
+        self.address = address
 
     def getIssueWithLabels(self, labels):
         labels = ",".join(labels)
-        return self.address + "/issues?labels={}&state=opened".format(labels)
+        return self.address + "/issues?labels={}&state=opened&per_page={}".format(labels, Paginator.MAX_PER_PAGE)
     
     def getIssueById(self, issueId, opened):
         op = ""
@@ -90,8 +322,8 @@ class GitlabResources(object):
             op = "?state=opened"
         return self.address + "/issues/{}{}".format(issueId, op)
 
-    def putLabelsToIssue(self, issueIid, labelsArray):
-        return self.address + "/issues/{}?labels={}".format(issueIid, ",".join(labelsArray))
+    def putLabelChanges(self, issueIid, add = [], remove = []):
+        return Utils.labelChanges(self.address + "/issues/{}".format(issueIid), add, remove)
 
     def putAssignIssue(self, issueId, userId):
         return self.address + "/issues/{}?assignee_ids={}".format(issueId, userId)
@@ -114,6 +346,30 @@ class Utils(object):
     def encode(text):
         return urllib.parse.quote(text)
 
+    def encodePath(projectId):
+        # numeric ids and namespaced paths like group/project
+        return urllib.parse.quote(str(projectId), safe = "")
+
+    def projectAddress(configuration, projectId):
+        return "{}/projects/{}".format(configuration.getApiAddress(), Utils.encodePath(projectId))
+
+    def issueSummary(issue):
+        assignees = [assignee["username"] for assignee in issue["assignees"]]
+        return "Issue: {}\n -> labels: {}\n -> assignees: {}".format(issue["title"], issue["labels"], assignees)
+
+    def labelChanges(endpoint, add, remove):
+        # add_labels/remove_labels change only the named labels on the server, no
+        # read of the current list and nothing a concurrent change could lose
+        if len(add) > 0:
+            endpoint = Utils.addQuery(endpoint, "add_labels={}".format(",".join(Utils.encode(label) for label in add)))
+        if len(remove) > 0:
+            endpoint = Utils.addQuery(endpoint, "remove_labels={}".format(",".join(Utils.encode(label) for label in remove)))
+        return endpoint
+
+    def addQuery(endpoint, query):
+        separator = "&" if "?" in endpoint else "?"
+        return endpoint + separator + query
+
     def jsonDump(jsonDict):
         result = {}
         for key in jsonDict:
@@ -129,93 +385,640 @@ class Utils(object):
                 
         return text
 
+    def privateDirectory(path):
+        # the cache holds answers of private projects, only the user may list it;
+        # makedirs would give the intermediate directories the default mode
+        if path == "" or os.path.isdir(path):
+            return
+        Utils.privateDirectory(os.path.dirname(path))
+        try:
+            os.mkdir(path, 0o700)
+        except FileExistsError:
+            pass
+
+    def openPrivate(path):
+        # for writing, readable by the user only (os.replace keeps the mode)
+        return os.fdopen(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w")
+
+class CacheEntry(object):
+
+    def __init__(self, path, data):
+        self.path = path
+        self.data = data
+
+    def isFresh(self, ttl):
+        return time.time() - self.data["stored"] < ttl
+
+    def conditionalHeaders(self):
+        headers = {}
+        if "ETag" in self.data["headers"]:
+            headers["If-None-Match"] = self.data["headers"]["ETag"]
+        if "Last-Modified" in self.data["headers"]:
+            headers["If-Modified-Since"] = self.data["headers"]["Last-Modified"]
+        return headers
+
+    def response(self):
+        import requests
+        answer = requests.Response()
+        answer.status_code = self.data["status"]
+        answer.url = self.data["url"]
+        answer.headers = requests.structures.CaseInsensitiveDict(self.data["headers"])
+        answer.encoding = "utf-8"
+        answer._content = self.data["body"].encode("utf-8")
+        return answer
+
+
+class ResponseCache(object):
+
+    # On-disk cache of GET answers keyed by url and token. Within the ttl of a
+    # resource the stored answer is used as is, afterwards it is revalidated with
+    # If-None-Match/If-Modified-Since so unchanged resources come back as 304.
+    # Entries live in one directory per resource (issue, MR, collection), writes
+    # drop the directories of the resource they touch.
+
+    DEFAULT_TTL = {"/boards": 300, "/members": 3600, "/users": 3600}
+    SKIPPED_HEADERS = ["set-cookie", "content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"]
+
+    def __init__(self, configuration, refresh = False):
+        self.refresh = refresh
+        self.maxSize = configuration.getCacheSize() * 1024 * 1024
+        self.ttl = dict(ResponseCache.DEFAULT_TTL)
+        self.ttl.update(configuration.getCacheTtl())
+        self.identity = hashlib.sha256(configuration.getToken().encode("utf-8")).hexdigest()
+        self.directory = os.path.join(configuration.getCacheDir(), "http")
+        self.size = None
+        self.lock = threading.Lock()
+
+    def lookup(self, endpoint):
+        path = self._entryPath(endpoint)
+        try:
+            with open(path, "r") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if data["url"] != endpoint:
+            return None
+        return CacheEntry(path, data)
+
+    def isFresh(self, entry):
+        return not self.refresh and entry.isFresh(self.ttlFor(entry.data["url"]))
+
+    def ttlFor(self, endpoint):
+        path = urllib.parse.urlsplit(endpoint).path
+        matches = [resource for resource in self.ttl if resource in path]
+        if len(matches) == 0:
+            return 0
+        return self.ttl[max(matches, key = len)]
+
+    def revalidated(self, entry):
+        entry.data["stored"] = time.time()
+        self._write(entry.path, entry.data)
+
+    def touch(self, entry):
+        # mtime is the last use for the LRU eviction
+        try:
+            os.utime(entry.path)
+        except OSError:
+            pass
+
+    def store(self, endpoint, answer):
+        try:
+            body = answer.content.decode("utf-8")
+        except UnicodeDecodeError:
+            return
+        headers = {key: value for key, value in answer.headers.items() if key.lower() not in ResponseCache.SKIPPED_HEADERS}
+        data = {"url": endpoint, "status": answer.status_code, "headers": headers, "body": body, "stored": time.time()}
+        written = self._write(self._entryPath(endpoint), data)
+        self._grow(written)
+
+    def invalidate(self, endpoint):
+        scope = self._scope(endpoint)
+        scopes = [scope]
+        parent, last = scope.rsplit("/", 1)
+        if last.isdigit():
+            # a changed issue/MR also changes the lists it shows up in
+            scopes.append(parent)
+        for scope in scopes:
+            directory = self._scopeDirectory(scope)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+
+    def _scope(self, endpoint):
+        # .../projects/<id>/<collection>/<id>/... belongs to the single resource,
+        # .../projects/<id>/<collection>?... to the collection
+        url = urllib.parse.urlsplit(endpoint)
+        parts = url.path.rstrip("/").split("/")
+        if "projects" in parts:
+            parts = parts[:parts.index("projects") + 4]
+        return url.netloc + "/".join(parts)
+
+    def _scopeDirectory(self, scope):
+        return os.path.join(self.directory, hashlib.sha1((self.identity + scope).encode("utf-8")).hexdigest())
+
+    def _entryPath(self, endpoint):
+        name = hashlib.sha256((self.identity + endpoint).encode("utf-8")).hexdigest()
+        return os.path.join(self._scopeDirectory(self._scope(endpoint)), name)
+
+    def _write(self, path, data):
+        try:
+            Utils.privateDirectory(os.path.dirname(path))
+            temporary = "{}.{}.{}.tmp".format(path, os.getpid(), threading.get_ident())
+            with Utils.openPrivate(temporary) as file:
+                json.dump(data, file)
+            size = os.path.getsize(temporary)
+            os.replace(temporary, path)
+            return size
+        except OSError:
+            return 0
+
+    def _grow(self, written):
+        with self.lock:
+            if self.size is None:
+                self.size = sum(size for path, size, used in self._entries())
+            else:
+                self.size += written
+            if self.size > self.maxSize:
+                self._evict()
+
+    def _evict(self):
+        # least recently used first, down to 80% of the limit to not evict on every store
+        entries = sorted(self._entries(), key = lambda entry: entry[2])
+        self.size = sum(size for path, size, used in entries)
+        for path, size, used in entries:
+            if self.size <= self.maxSize * 0.8:
+                break
+            try:
+                os.remove(path)
+                self.size -= size
+            except OSError:
+                pass
+
+    def _entries(self):
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for scope in os.listdir(self.directory):
+            scopeDirectory = os.path.join(self.directory, scope)
+            for name in os.listdir(scopeDirectory):
+                try:
+                    stat = os.stat(os.path.join(scopeDirectory, name))
+                    entries.append((os.path.join(scopeDirectory, name), stat.st_size, stat.st_mtime))
+                except OSError:
+                    pass
+        return entries
+
+
 class RequestFactory(object):
 
-    def __init__(self, configuration):
+    # Besides the response cache the factory keeps a memo for the call:
+    # identical GETs running at the same time share one request, and the answer
+    # of a PUT on a single resource (an issue) answers the GETs of that resource
+    # for MEMO_TTL seconds. Writes drop the memo of the resource they touch,
+    # every new call (daemon, batch line) starts without one.
+    # Every call goes through _send: connect and read timeouts, retries with
+    # jittered backoff for idempotent calls, the rate limiter and the circuit
+    # breaker of the host.
+
+    MEMO_TTL = 5
+    RETRY_STATUS = [429, 500, 502, 503, 504]
+    BACKOFF = 0.5
+    MAX_BACKOFF = 30
+    MAX_RETRY_AFTER = 60
+
+    def __init__(self, configuration, cache = None):
         self.config = configuration
-
-    def get(self, endpoint):
-        print(endpoint)
-        r = requests.get(url = endpoint, headers = {'private-token': '{}'.format(self.config.getToken())})
+        self.timeout = (configuration.getConnectTimeout(), configuration.getTimeout())
+        self.retries = configuration.getRetries()
+        self.limiter = RateLimiter.forHost(configuration.getHostAddress(), configuration.getRateLimit())
+        self.breaker = CircuitBreaker.forHost(configuration.getHostAddress())
+        self.cache = cache
+        self._session = None
+        self._sessionLock = threading.Lock()
+        self._shared = {}
+        self._memo = {}
+        self._inflight = {}
+        self._memoLock = threading.Lock()
+
+    @property
+    def session(self):
+        with self._sessionLock:
+            if self._session is None:
+                self._session = self._createSession()
+            return self._session
+
+    def _createSession(self):
+        # One keep-alive session for the whole process, so consecutive calls reuse
+        # the TCP/TLS connection instead of doing a new handshake each time.
+        import requests
+        session = requests.Session()
+        # Paginator workers share the pool, so it has to hold at least one connection per worker
+        poolSize = max(self.config.getPoolSize(), self.config.getConcurrency())
+        adapter = requests.adapters.HTTPAdapter(pool_connections = poolSize, pool_maxsize = poolSize)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({'private-token': '{}'.format(self.config.getToken()), 'Connection': 'keep-alive'})
+        return session
+
+    def shared(self, key, create):
+        # objects that live as long as the session, like the board labels
+        with self._sessionLock:
+            if key not in self._shared:
+                self._shared[key] = create()
+            return self._shared[key]
+
+    def get(self, endpoint, revalidate = False, stream = False):
+        # stream leaves the body unread for JsonElements, only without the cache
+        # which stores whole bodies. An unread body has a single reader, so
+        # streamed GETs are never shared.
+        started = time.perf_counter()
+        if not revalidate:
+            r = self._remembered(endpoint)
+            if r is not None:
+                tracer.request("GET", endpoint, r, started, "memo")
+                return r
+        if stream and self.cache is None:
+            r, cacheState, retries = self._cachedGet(endpoint, revalidate, stream)
+            tracer.request("GET", endpoint, r, started, cacheState, retries)
+            return r
+
+        from concurrent.futures import Future
+        key = (endpoint, revalidate)
+        with self._memoLock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+        if not owner:
+            r = future.result()
+            tracer.request("GET", endpoint, r, started, "shared")
+            return r
+        try:
+            r, cacheState, retries = self._cachedGet(endpoint, revalidate)
+            future.set_result(r)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._memoLock:
+                del self._inflight[key]
+        tracer.request("GET", endpoint, r, started, cacheState, retries)
         return r
 
+    def _cachedGet(self, endpoint, revalidate, stream = False):
+        if self.cache is None:
+            r, retries = self._send("GET", endpoint, stream = stream)
+            return r, None, retries
+
+        entry = self.cache.lookup(endpoint)
+        if entry is not None and not revalidate and self.cache.isFresh(entry):
+            self.cache.touch(entry)
+            return entry.response(), "hit", 0
+        headers = entry.conditionalHeaders() if entry is not None else {}
+        r, retries = self._send("GET", endpoint, headers = headers)
+        if r.status_code == 304 and entry is not None:
+            self.cache.revalidated(entry)
+            return entry.response(), "revalidated", retries
+        if r.status_code == 200:
+            self.cache.store(endpoint, r)
+        return r, "miss", retries
+
     def post(self, endpoint, requestDataDict):
-        r = requests.post(url = endpoint, data = requestDataDict, headers = {'private-token': '{}'.format(self.config.getToken())})
+        # a POST creates a note, it is sent again only when it never left
+        started = time.perf_counter()
+        r, retries = self._send("POST", endpoint, idempotent = False, data = requestDataDict)
+        tracer.request("POST", endpoint, r, started, retries = retries)
+        self._invalidate(endpoint)
         return r
     
+    def graphql(self, endpoint, payload):
+        # GraphQL reads are POSTs, they neither go through the cache nor invalidate it
+        started = time.perf_counter()
+        r, retries = self._send("POST", endpoint, json = payload)
+        tracer.request("POST", endpoint, r, started, retries = retries)
+        return r
+
     def put(self, endpoint):
-        r = requests.put(url = endpoint,         headers = {'private-token': '{}'.format(self.config.getToken())})
+        # the PUTs set labels, assignees and state to given values, sending one twice is harmless
+        started = time.perf_counter()
+        r, retries = self._send("PUT", endpoint)
+        tracer.request("PUT", endpoint, r, started, retries = retries)
+        self._invalidate(endpoint)
+        self._remember(endpoint, r)
         return r
 
+    def _send(self, method, endpoint, idempotent = True, **kwargs):
+        # returns the answer and the number of retries it took
+        import requests
+        retries = 0
+        while True:
+            self.breaker.check()
+            self.limiter.acquire()
+            try:
+                r = self.session.request(method, endpoint, timeout = self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.breaker.failed()
+                # a connect timeout never reached the server, anything else may have
+                if retries >= self.retries or not (idempotent or isinstance(e, requests.ConnectTimeout)):
+                    raise
+                retries += 1
+                tracer.note("{} {} failed ({}), retry {} of {}".format(method, endpoint, type(e).__name__, retries, self.retries))
+                time.sleep(RequestFactory.backoff(retries))
+                continue
+            if r.status_code >= 500:
+                self.breaker.failed()
+            else:
+                self.breaker.succeeded()
+            self.limiter.update(r)
+            wait = RateLimiter.retryAfter(r)
+            if wait is not None and wait > RequestFactory.MAX_RETRY_AFTER:
+                # not worth waiting for, the answer goes back and nobody is held up
+                return r, retries
+            if wait is not None:
+                # the server said how long, every worker of the host waits
+                self.limiter.pause(wait)
+            if r.status_code in RequestFactory.RETRY_STATUS and idempotent and retries < self.retries:
+                retries += 1
+                tracer.note("{} {} answered {}, retry {} of {}".format(method, endpoint, r.status_code, retries, self.retries))
+                # reading the short error body hands the connection back to the pool
+                r.content
+                if wait is None:
+                    time.sleep(RequestFactory.backoff(retries))
+                continue
+            return r, retries
+
+    def backoff(retry):
+        # exponential with equal jitter, so workers that failed together do not come back together
+        import random
+        delay = min(RequestFactory.MAX_BACKOFF, RequestFactory.BACKOFF * 2 ** (retry - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def forgetMemo(self):
+        with self._memoLock:
+            self._memo = {}
+
+    def _invalidate(self, endpoint):
+        if self.cache is not None:
+            self.cache.invalidate(endpoint)
+        resource = RequestFactory._resource(endpoint)
+        with self._memoLock:
+            for key in [key for key in self._memo if key == resource or key.startswith(resource + "/")]:
+                del self._memo[key]
+
+    def _remember(self, endpoint, answer):
+        # GitLab answers a PUT with the changed resource, as a GET of it would
+        url = urllib.parse.urlsplit(endpoint)
+        if answer.status_code != 200 or not url.path.rstrip("/").split("/")[-1].isdigit():
+            return
+        with self._memoLock:
+            self._memo[RequestFactory._resource(endpoint)] = (time.time(), answer)
+
+    def _remembered(self, endpoint):
+        # only a plain GET of the resource itself, not of its notes or other parts
+        # below it. ?state= does not matter for a single issue.
+        url = urllib.parse.urlsplit(endpoint)
+        if len(set(urllib.parse.parse_qs(url.query)) - {"state"}) > 0:
+            return None
+        resource = RequestFactory._resource(endpoint)
+        if "{}://{}{}".format(url.scheme, url.netloc, url.path.rstrip("/")) != resource:
+            return None
+        with self._memoLock:
+            entry = self._memo.get(resource)
+        if entry is None or time.time() - entry[0] >= RequestFactory.MEMO_TTL:
+            return None
+        return entry[1]
+
+    def _resource(endpoint):
+        # .../projects/<id>/<collection>/<id> of a url, like the scopes of the cache
+        url = urllib.parse.urlsplit(endpoint)
+        parts = url.path.rstrip("/").split("/")
+        if "projects" in parts:
+            parts = parts[:parts.index("projects") + 4]
+        return "{}://{}{}".format(url.scheme, url.netloc, "/".join(parts))
+
+    def gather(self, *calls):
+        # Runs independent calls and returns their results in order. The sync
+        # engine runs them one after another.
+        return [call() for call in calls]
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+
+
+class RateLimiter(object):
+
+    # Token bucket shared by every thread that talks to a host. rate-limit sets
+    # the requests per second; the RateLimit-Remaining/RateLimit-Reset headers of
+    # GitLab lower it so the remaining requests spread over the rest of the
+    # window instead of running into 429. Retry-After pauses the whole bucket.
+
+    BURST = 10
+    # a spent budget slows the calls down, it never stalls them
+    MIN_RATE = 0.2
+    _hosts = {}
+    _hostsLock = threading.Lock()
+
+    def forHost(host, rate):
+        with RateLimiter._hostsLock:
+            if host not in RateLimiter._hosts:
+                RateLimiter._hosts[host] = RateLimiter(rate)
+            return RateLimiter._hosts[host]
+
+    def __init__(self, rate = None):
+        self.configured = rate
+        self.rate = rate
+        self.tokens = RateLimiter.BURST
+        self.updated = time.monotonic()
+        self.pausedUntil = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if self.rate is not None:
+                    self.tokens = min(RateLimiter.BURST, self.tokens + (now - self.updated) * self.rate)
+                    # never a debt longer than a burst, whatever happened before
+                    self.tokens = max(-RateLimiter.BURST, self.tokens)
+                self.updated = now
+                if now < self.pausedUntil:
+                    wait = self.pausedUntil - now
+                elif self.rate is None:
+                    # unlimited, the bucket only counts once a rate is known
+                    return
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                else:
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def update(self, answer):
+        remaining = answer.headers.get("RateLimit-Remaining")
+        reset = answer.headers.get("RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        try:
+            window = max(float(reset) - time.time(), 1.0)
+            rate = max(float(remaining) / window, RateLimiter.MIN_RATE)
+        except ValueError:
+            return
+        with self.lock:
+            if self.rate is None:
+                # the first limit of the server starts from a full bucket
+                self.tokens = RateLimiter.BURST
+                self.updated = time.monotonic()
+            self.rate = rate if self.configured is None else min(rate, self.configured)
+
+    def pause(self, seconds):
+        with self.lock:
+            self.pausedUntil = max(self.pausedUntil, time.monotonic() + seconds)
+
+    def retryAfter(answer):
+        # seconds or an HTTP date
+        value = answer.headers.get("Retry-After")
+        if value is None:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+        import email.utils
+        try:
+            return max(email.utils.parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError):
+            return None
+
+
+class CircuitBreaker(object):
+
+    # After THRESHOLD calls in a row failed with a connection error or a 5xx
+    # answer, calls to the host fail at once for COOLDOWN seconds instead of
+    # waiting for their timeouts and retries. Then one call may try again.
+
+    THRESHOLD = 5
+    COOLDOWN = 30
+    _hosts = {}
+    _hostsLock = threading.Lock()
+
+    def forHost(host):
+        with CircuitBreaker._hostsLock:
+            if host not in CircuitBreaker._hosts:
+                CircuitBreaker._hosts[host] = CircuitBreaker(host)
+            return CircuitBreaker._hosts[host]
+
+    def __init__(self, host):
+        self.host = host
+        self.failures = 0
+        self.openedAt = None
+        self.lock = threading.Lock()
+
+    def check(self):
+        with self.lock:
+            if self.openedAt is None:
+                return
+            left = self.openedAt + CircuitBreaker.COOLDOWN - time.monotonic()
+            if left > 0:
+                raise GitlabError("{} failed {} times in a row, not calling it for another {:.0f}s".format(self.host, self.failures, left))
+            # half open: this call is the trial, the next failure opens again
+            self.openedAt = None
+            self.failures = CircuitBreaker.THRESHOLD - 1
+
+    def failed(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= CircuitBreaker.THRESHOLD:
+                self.openedAt = time.monotonic()
+
+    def succeeded(self):
+        with self.lock:
+            self.failures = 0
+            self.openedAt = None
+
+
+class AsyncRequestFactory(RequestFactory):
+
+    # async engine. gather() runs the independent calls of a command (issue and
+    # its notes, MR and its discussions) at the same time: requests blocks, so
+    # each call goes to the executor of an asyncio loop.
+
+    def __init__(self, configuration, cache = None):
+        from concurrent.futures import ThreadPoolExecutor
+        super().__init__(configuration, cache)
+        self.executor = ThreadPoolExecutor(max_workers = configuration.getConcurrency())
+
+    async def runAsync(self, call):
+        import asyncio
+        return await asyncio.get_running_loop().run_in_executor(self.executor, call)
+
+    async def gatherAsync(self, *calls):
+        import asyncio
+        return await asyncio.gather(*[self.runAsync(call) for call in calls])
+
+    def gather(self, *calls):
+        import asyncio
+        return list(asyncio.run(self.gatherAsync(*calls)))
+
+    def close(self):
+        self.executor.shutdown()
+        super().close()
+
 class GitLab(object):
 
     def __init__(self, requestFactory, resources):
         self.requestFactory = requestFactory
         self.res = resources
+        self.boardLabels = BoardLabels.shared(requestFactory, resources.address)
 
     def removeReadyLabel(self, panelName):
         endpoint = self.res.getIssueWithLabels([panelName, "Ready"]) 
         answer = self.requestFactory.get(endpoint)
         answerJson = answer.json()
        
-        issuesWithLabels = {}   
+        issuesWithLabels = []   
         for issue in answerJson:
             labels = issue["labels"]
-            print("Name: {}, iid={}, Labels: {}".format(issue["title"], issue["iid"], labels))
+            printer.out("Name: {}, iid={}, Labels: {}".format(issue["title"], issue["iid"], labels))
             if "Ready" in labels:
-                issueId = issue["iid"]
-                labels.remove("Ready")
-                issuesWithLabels[issueId] = labels
+                issuesWithLabels.append(issue["iid"])
                 
-        for issue, labels in issuesWithLabels.items():
-            endpoint = self.res.putLabelsToIssue(issue, labels) 
-            print("remove label {}".format(endpoint))
+        for issue in issuesWithLabels:
+            endpoint = self.res.putLabelChanges(issue, remove = ["Ready"]) 
+            printer.out("remove label {}".format(endpoint))
             answer = self.requestFactory.put(endpoint)
             
     def moveToPanel(self, issueId, labelName):
-        answer = self.requestFactory.get(self.res.getProjectBoards())
-        allLabels = []
-        boards = answer.json()
-        for b in boards:
-            lists = b["lists"]
-            for list in lists:
-                allLabels.append(list["label"]["name"])
-            
-        if labelName not in allLabels:
-            print("List {} not known.\nKnown lists {}", labelName, allLabels)
+        if not self.boardLabels.contains(labelName):
+            printer.out("List {} not known.\nKnown lists {}".format(labelName, sorted(self.boardLabels.labels())))
             return
+        otherLabels = sorted(self.boardLabels.labels() - {labelName})
         
-        answer = self.requestFactory.get(self.res.getIssueById(issueId, True)).json()
-        labels = answer["labels"]
-        for panelLabel in allLabels:
-            if panelLabel in labels:
-                print("Remove list label {}".format(panelLabel))
-                labels.remove(panelLabel)
-        
-        labels.append(labelName)  
-        labels = [Utils.encode(x) for x in labels]
-        print("Set labels {}".format(labels))
-        answer = self.requestFactory.put(self.res.putLabelsToIssue(issueId, labels))
-        print(answer.json())
+        answer = self.requestFactory.put(self.res.putLabelChanges(issueId, add = [labelName], remove = otherLabels)).json()
+        if "labels" in answer:
+            printer.out("Set labels {}".format(answer["labels"]))
+        printer.out(answer)
         
     def assignToUser(self, issueId, userName):
-        answer = self.requestFactory.get(self.res.getUsersByName(userName))
-        users = answer.json()
-        
-        foundUser = None
-        for user in users:
-            if user["username"] == userName:
-                foundUser = user
-                break
-
-        assert foundUser is not None, "No user found"
+        userId = UserDirectory.shared(self.requestFactory, self.res.address).find(userName)
+        if userId is None:
+            raise GitlabError("No user found")
             
-        answer = self.requestFactory.put(self.res.putAssignIssue(issueId, foundUser["id"]))
-        print(answer.json())
+        answer = self.requestFactory.put(self.res.putAssignIssue(issueId, userId)).json()
+        if "id" not in answer:
+            raise GitlabError("Failed to assign issue {}: {}".format(issueId, answer))
+        return Utils.issueSummary(answer)
     
     def unassignIssue(self, issueId):
-        answer = self.requestFactory.put(self.res.putAssignIssue(issueId, "0"))
-        print(answer.json())
+        answer = self.requestFactory.put(self.res.putAssignIssue(issueId, "0")).json()
+        if "id" not in answer:
+            raise GitlabError("Failed to unassign issue {}: {}".format(issueId, answer))
+        return Utils.issueSummary(answer)
         
         
     def printOpenMergeRequests(self):
@@ -236,7 +1039,7 @@ class GitLab(object):
             row = [self.lineBreak(x, 30) for x in row]
             rows.append(row)
         
-        print(tabulate(rows, headers=["id", "👍", "title", "author", "notes", "wip" , "status", "url"], tablefmt="simple"))
+        printer.out(tabulate(rows, headers=["id", "👍", "title", "author", "notes", "wip" , "status", "url"], tablefmt="simple"))
         
     def printMergeRequest(self, mrId):
         answer = self.requestFactory.get(self.res.getMergeRequest(mrId)).json()
@@ -247,13 +1050,13 @@ class GitLab(object):
         mergeStatus = answer["merge_status"]
         workInProgress = answer["work_in_progress"]
         
-        print("Title: {},\nDescription: {},\nAuthor: {},\nUpvotes: {},\nMR-Status: {},\nWIP: {}"                 .format(title, description, author, upVotes, mergeStatus, workInProgress))
+        printer.out("Title: {},\nDescription: {},\nAuthor: {},\nUpvotes: {},\nMR-Status: {},\nWIP: {}"                 .format(title, description, author, upVotes, mergeStatus, workInProgress))
 
         notes = self.requestFactory.get(self.res.getMergeRequestNotes(mrId)).json()
         for note in notes:
             author = note["author"]["username"]
             body = note["body"]
-            print("--------\nauthor {}: {}".format(author, body))
+            printer.out("--------\nauthor {}: {}".format(author, body))
         
     def lineBreak(self, text, chars):
         if type(text) is not str:
@@ -270,39 +1073,605 @@ class GitLab(object):
         
         description = answer["description"] 
         labels = answer["labels"]
-        print("* Description: {}".format(description))
-        print("* Lables: {}".format(labels))
-        print("* State: {}".format(answer["state"]))
+        printer.out("* Description: {}".format(description))
+        printer.out("* Lables: {}".format(labels))
+        printer.out("* State: {}".format(answer["state"]))
         for note in notes:
             author = note["author"]["username"]
             body = note["body"]
+            import pdb
             pdb.set_trace()
-            print("--------\nauthor {}: {}".format(author, body))
+            printer.out("--------\nauthor {}: {}".format(author, body))
 
 
 class Printer(object):
 
+    FORMATS = ["ndjson", "csv", "json"]
+    STATE = ["format", "fields", "stdout", "stderr", "tty", "columns"]
+
+    def __init__(self):
+        # format, fields, stdout, ... are read from here, or from the thread's own
+        # state while it captures the output of a batch line
+        self._process = dict.fromkeys(Printer.STATE)
+        self._threads = threading.local()
+
+    def __getattr__(self, name):
+        if name not in Printer.STATE:
+            raise AttributeError(name)
+        return self._state()[name]
+
+    def _state(self):
+        return getattr(self._threads, "state", None) or self._process
+
+    def redirect(self, stdout, stderr, tty, columns):
+        # the daemon sends the output of a call to its client. Calls run one at a
+        # time, so this is for the whole process including worker threads.
+        self._process.update(stdout = stdout, stderr = stderr, tty = tty, columns = columns)
+
+    def reset(self):
+        self.redirect(None, None, None, None)
+
+    def capture(self, stdout, stderr):
+        # output of the calling thread only, other threads keep printing as before
+        self._threads.state = dict(self._process, stdout = stdout, stderr = stderr)
+
+    def release(self):
+        self._threads.state = None
+
+    def setFormat(self, format, fields):
+        if format is not None and format not in Printer.FORMATS:
+            self.out("Unknown format {}, use one of {}".format(format, ", ".join(Printer.FORMATS)))
+            sys.exit(1)
+        self._state().update(format = format, fields = fields)
+
     def out(self, message):
-        print(message)
+        with tracer.rendering():
+            print(message, file = self.stdout or sys.stdout)
+
+    def err(self, message):
+        stream = self.stderr or sys.stderr
+        stream.write(message)
+        stream.flush()
+
+    def isatty(self):
+        return sys.stdout.isatty() if self.tty is None else self.tty
+
+    def terminalColumns(self):
+        import shutil
+        return shutil.get_terminal_size().columns if self.columns is None else self.columns
+
+    def projection(self, tableFields):
+        # fields a list command needs from the API: the table's, or --fields for
+        # records. None keeps whole elements for ndjson/json without --fields.
+        if self.format is None or self.format == "csv" and self.fields is None:
+            return tableFields
+        if self.fields is None:
+            return None
+        return self.fields + tableFields
+
+    def records(self, elements, defaultFields):
+        # --format: list commands hand over the API elements instead of building
+        # table rows. Returns False for the normal table output.
+        if self.format is None:
+            return False
+        RecordWriter(self.format, self.fields, defaultFields).write(elements)
+        return True
+
+
+class RecordWriter(object):
+
+    # Writes API elements as they arrive, projected to --fields (dotted paths like
+    # author.username). Without --fields ndjson and json keep the whole element,
+    # csv uses the columns of the command's table.
+
+    def __init__(self, format, fields, defaultFields):
+        self.format = format
+        self.fields = fields
+        if fields is None and format == "csv":
+            self.fields = defaultFields
+
+    def write(self, elements):
+        if self.format == "csv":
+            self._writeCsv(elements)
+        elif self.format == "json":
+            self._writeJson(elements)
+        else:
+            for element in elements:
+                printer.out(json.dumps(self.project(element), ensure_ascii = False))
+
+    def _writeJson(self, elements):
+        separator = "["
+        for element in elements:
+            printer.out(separator + json.dumps(self.project(element), ensure_ascii = False))
+            separator = ","
+        printer.out("[]" if separator == "[" else "]")
+
+    def _writeCsv(self, elements):
+        import csv
+        import io
+        line = io.StringIO()
+        writer = csv.writer(line, lineterminator = "")
+        rows = itertools.chain([self.fields], ([RecordWriter._csvValue(value) for value in self.project(element).values()] for element in elements))
+        for row in rows:
+            writer.writerow(row)
+            printer.out(line.getvalue())
+            line.seek(0)
+            line.truncate()
+
+    def project(self, element):
+        if self.fields is None:
+            return element
+        return {field: RecordWriter._lookup(element, field) for field in self.fields}
+
+    def _lookup(element, path):
+        for key in path.split("."):
+            if isinstance(element, dict):
+                element = element.get(key)
+            elif isinstance(element, list) and key.isdigit() and int(key) < len(element):
+                element = element[int(key)]
+            else:
+                return None
+        return element
+
+    def _csvValue(value):
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, ensure_ascii = False)
+        return "" if value is None else value
+
+
+class StreamTable(object):
+
+    # Prints a table in tabulate's "simple" format while the rows arrive. The
+    # column widths come from the first sample rows, limited to the terminal
+    # width; later cells that do not fit are cut. Afterwards only the current
+    # row is kept.
+
+    def __init__(self, headers, sample = 100):
+        self.headers = headers
+        self.sample = sample
+        self.buffered = []
+        self.widths = None
+        self.numeric = None
+
+    def add(self, row):
+        row = ["" if cell is None else cell for cell in row]
+        if self.widths is not None:
+            self._printRow(row)
+            return
+        self.buffered.append(row)
+        if len(self.buffered) >= self.sample:
+            self._start()
+
+    def close(self):
+        if self.widths is None:
+            self._start()
+
+    def _start(self):
+        columns = list(zip(*self.buffered)) if len(self.buffered) > 0 else [[] for header in self.headers]
+        self.numeric = [len(column) > 0 and all(StreamTable._isNumber(cell) for cell in column) for column in columns]
+        self.widths = [max([len(header)] + [StreamTable._width(cell) for cell in column]) for header, column in zip(self.headers, columns)]
+        self._fitTerminal()
+        self._printRow(self.headers, header = True)
+        printer.out("  ".join("-" * width for width in self.widths))
+        for row in self.buffered:
+            self._printRow(row)
+        self.buffered = []
+
+    def _fitTerminal(self):
+        if not printer.isatty():
+            return
+        budget = printer.terminalColumns() - 2 * (len(self.widths) - 1)
+        # shrink the widest column until the table fits, but keep every column readable
+        while sum(self.widths) > budget:
+            widest = self.widths.index(max(self.widths))
+            if self.widths[widest] <= 8:
+                return
+            self.widths[widest] -= 1
+
+    def _printRow(self, row, header = False):
+        for line in self.formatRow(row, header):
+            printer.out(line)
+
+    def formatRow(self, row, header = False):
+        # the printed lines of a row, only valid once the widths are known
+        cells = [str("" if cell is None else cell).split("\n") for cell in row]
+        lines = []
+        for line in range(max(len(cell) for cell in cells)):
+            parts = []
+            for index, cell in enumerate(cells):
+                text = self._cut(cell[line] if line < len(cell) else "", self.widths[index])
+                if self.numeric[index] and not header:
+                    parts.append(text.rjust(self.widths[index]))
+                else:
+                    parts.append(text.ljust(self.widths[index]))
+            lines.append("  ".join(parts).rstrip())
+        return lines
+
+    def _cut(self, text, width):
+        if len(text) <= width:
+            return text
+        return text[:width - 1] + "…"
+
+    def _isNumber(cell):
+        return isinstance(cell, (int, float)) and not isinstance(cell, bool)
+
+    def _width(cell):
+        return max(len(line) for line in str(cell).split("\n"))
+
+
+class Tracer(object):
+
+    # Records every HTTP call and the time spent rendering output. --trace prints
+    # the calls to stderr as they happen and a summary at exit, --trace-file
+    # writes everything as JSON.
+
+    def __init__(self):
+        self.live = False
+        self.path = None
+        self.records = []
+        self.renderTime = 0.0
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def enable(self, live, path):
+        self.live = live
+        self.path = path
+        # a daemon process traces many calls
+        self.records = []
+        self.renderTime = 0.0
+        self.started = time.perf_counter()
+
+    def isEnabled(self):
+        return self.live or self.path is not None
+
+    def request(self, method, url, answer, started, cache = None, retries = 0):
+        if not self.isEnabled():
+            return
+        latency = time.perf_counter() - started
+        cached = cache in ("hit", "revalidated", "memo", "shared")
+        page = answer.headers.get("X-Page") or urllib.parse.parse_qs(urllib.parse.urlsplit(url).query).get("page", [None])[0]
+        if cached:
+            size = 0
+        elif JsonElements.unread(answer):
+            # reading the content here would defeat the streaming
+            size = int(answer.headers.get("Content-Length", 0))
+        else:
+            size = len(answer.content)
+        record = {"method": method, "url": url, "status": answer.status_code, "latency": round(latency, 4),
+                  "bytes": size, "page": int(page) if page else None,
+                  "cache": cache, "retries": retries}
+        with self.lock:
+            self.records.append(record)
+        if self.live:
+            printer.err("[trace] {} {} {} {:.0f}ms {}B page={} cache={} retries={}\n".format(method, record["status"], url,
+                             latency * 1000, record["bytes"], record["page"], cache, retries))
+
+    def note(self, message):
+        if self.live:
+            printer.err("[trace] {}\n".format(message))
+
+    def rendering(self):
+        return TraceTimer(self)
+
+    def summary(self, command):
+        wall = time.perf_counter() - self.started
+        return {"command": " ".join(command), "requests": len(self.records),
+                "network": round(sum(r["latency"] for r in self.records), 4),
+                "bytes": sum(r["bytes"] for r in self.records),
+                "cacheHits": len([r for r in self.records if r["cache"] in ("hit", "revalidated", "memo", "shared")]),
+                "retries": sum(r["retries"] for r in self.records),
+                "rendering": round(self.renderTime, 4), "wall": round(wall, 4)}
+
+    def finish(self, command):
+        if not self.isEnabled():
+            return
+        summary = self.summary(command)
+        if self.live:
+            printer.err("[trace] {command}: {requests} requests, {network:.3f}s network, {bytes} bytes, {cacheHits} from cache, "
+                             "{retries} retries, {rendering:.3f}s rendering, {wall:.3f}s total\n".format(**summary))
+        if self.path is not None:
+            with open(self.path, "w") as file:
+                json.dump({"summary": summary, "requests": self.records}, file, indent = 2)
+
+
+class TraceTimer(object):
+
+    def __init__(self, tracer):
+        self.tracer = tracer
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *args):
+        elapsed = time.perf_counter() - self.started
+        with self.tracer.lock:
+            self.tracer.renderTime += elapsed
 
 
 class Paginator(object):
 
-    def fetchAll(requestFactory, apiRequest):
-        answer = requestFactory.get(apiRequest)
+    MAX_PER_PAGE = 100
+
+    def iterate(requestFactory, apiRequest, perPage = None, keyset = False, fields = None):
+        # Yields elements page by page, the next page is only requested once the
+        # consumer asks for more, so breaking out of the loop stops the paging.
+        # keyset is for resources that support it (projects, users, jobs, ...),
+        # the caller has to add a matching order_by.
+        # With fields every element is decoded on its own while the page arrives
+        # and only those fields are kept, see JsonElements.
+        query = []
+        if perPage is not None:
+            query.append("per_page={}".format(perPage))
+        if keyset:
+            query.append("pagination=keyset")
+        if len(query) > 0:
+            apiRequest = Utils.addQuery(apiRequest, "&".join(query))
+        answer = Paginator._get(requestFactory, apiRequest, fields)
+        return Paginator._iterateFrom(requestFactory, apiRequest, answer, fields)
+
+    def _iterateFrom(requestFactory, apiRequest, answer, fields = None):
+        while True:
+            for element in Paginator._elements(answer, fields):
+                yield element
+            nextRequest = Paginator.nextPage(apiRequest, answer)
+            if nextRequest is None:
+                return
+            answer = Paginator._get(requestFactory, nextRequest, fields)
+
+    def _get(requestFactory, apiRequest, fields):
+        return requestFactory.get(apiRequest, stream = fields is not None)
+
+    def _elements(answer, fields):
+        if fields is None:
+            return answer.json()
+        return JsonElements.iterate(answer, fields)
+
+    def nextPage(apiRequest, answer):
+        # The Link header is the only continuation for keyset pagination and is also
+        # sent for offset pagination, X-Next-Page is there even without totals.
+        if "next" in answer.links:
+            return answer.links["next"]["url"]
+        nextPage = answer.headers.get("X-Next-Page", "")
+        if nextPage == "":
+            return None
+        return Utils.addQuery(apiRequest, "page={}".format(nextPage))
+
+    def fetchAll(requestFactory, apiRequest, concurrency = None, fields = None):
+        answer = Paginator._get(requestFactory, apiRequest, fields)
+        if "X-Total-Pages" not in answer.headers:
+            # GitLab leaves out the totals for very large collections, follow the pages one by one
+            return list(Paginator._iterateFrom(requestFactory, apiRequest, answer, fields))
         totalPages = int(answer.headers["X-Total-Pages"])
         currentPage = int(answer.headers["X-Page"])
-        totalElements = int(answer.headers["X-Total"])
-
-        resultElements = [e for e in answer.json()]
 
-        for page in range(currentPage, totalPages):
-            page += 1
-            pagination = "&page={}".format(page)
-            answer = requestFactory.get(apiRequest + pagination)
-            [resultElements.append(e) for e in answer.json()]
+        resultElements = [e for e in Paginator._elements(answer, fields)]
+
+        if concurrency is None:
+            concurrency = requestFactory.config.getConcurrency()
+        pages = range(currentPage + 1, totalPages + 1)
+        if concurrency <= 1 or len(pages) <= 1:
+            for page in pages:
+                resultElements.extend(Paginator.fetchPage(requestFactory, apiRequest, page, fields))
+            return resultElements
+
+        # Total is known after the first answer, the remaining pages are independent.
+        # map() hands the results back in page order.
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers = min(concurrency, len(pages))) as executor:
+            for elements in executor.map(lambda page: Paginator.fetchPage(requestFactory, apiRequest, page, fields), pages):
+                resultElements.extend(elements)
         return resultElements
 
+    def stream(requestFactory, apiRequest, concurrency = None, fields = None):
+        # Yields elements in page order like iterate, but keeps up to concurrency
+        # pages in flight ahead of the consumer when the total is known. Only that
+        # window is held in memory.
+        answer = Paginator._get(requestFactory, apiRequest, fields)
+        if "X-Total-Pages" not in answer.headers:
+            yield from Paginator._iterateFrom(requestFactory, apiRequest, answer, fields)
+            return
+        totalPages = int(answer.headers["X-Total-Pages"])
+        pages = iter(range(int(answer.headers["X-Page"]) + 1, totalPages + 1))
+        if concurrency is None:
+            concurrency = requestFactory.config.getConcurrency()
+
+        from collections import deque
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers = max(concurrency, 1)) as executor:
+            fetch = lambda page: executor.submit(Paginator.fetchPage, requestFactory, apiRequest, page, fields)
+            window = deque(fetch(page) for page in itertools.islice(pages, concurrency))
+            yield from Paginator._elements(answer, fields)
+            while len(window) > 0:
+                elements = window.popleft().result()
+                for page in itertools.islice(pages, 1):
+                    window.append(fetch(page))
+                yield from elements
+
+    def fetchPage(requestFactory, apiRequest, page, fields = None):
+        answer = Paginator._get(requestFactory, Utils.addQuery(apiRequest, "page={}".format(page)), fields)
+        return list(Paginator._elements(answer, fields))
+
+class JsonElements(object):
+
+    # Decodes a JSON array answer one element at a time with raw_decode, from the
+    # socket when the request was streamed and from the body otherwise, and keeps
+    # only the given fields of each element. Dotted fields keep their nesting, so
+    # ["iid", "assignee.username"] gives {"iid": 1, "assignee": {"username": ..}}.
+    # Neither the whole body nor a list of complete elements is ever held.
+
+    CHUNK_SIZE = 64 * 1024
+    WHITESPACE = " \t\n\r"
+
+    def unread(answer):
+        return getattr(answer, "_content", None) is False
+
+    def iterate(answer, fields):
+        import codecs
+        if JsonElements.unread(answer):
+            chunks = answer.iter_content(JsonElements.CHUNK_SIZE)
+        else:
+            chunks = [answer.content]
+        decoder = json.JSONDecoder()
+        text = codecs.getincrementaldecoder("utf-8")()
+        buffer = ""
+        opened = False
+        try:
+            for chunk in itertools.chain(chunks, [None]):
+                last = chunk is None
+                buffer += text.decode(b"", final = True) if last else text.decode(chunk)
+                position = 0
+                while True:
+                    while position < len(buffer) and buffer[position] in JsonElements.WHITESPACE + ",":
+                        position += 1
+                    if position == len(buffer):
+                        break
+                    if not opened:
+                        if buffer[position] != "[":
+                            # an error object instead of a list
+                            raise GitlabError("Expected a list, got {}".format(buffer[position:position + 200]))
+                        opened = True
+                        position += 1
+                        continue
+                    if buffer[position] == "]":
+                        return
+                    try:
+                        element, position = decoder.raw_decode(buffer, position)
+                    except ValueError:
+                        if last:
+                            raise
+                        # the element continues in the next chunk
+                        break
+                    yield JsonElements.project(element, fields)
+                buffer = buffer[position:]
+        finally:
+            answer.close()
+
+    def project(element, fields):
+        result = {}
+        for field in fields:
+            source = element
+            target = result
+            keys = field.split(".")
+            for key in keys[:-1]:
+                source = source.get(key) if isinstance(source, dict) else None
+                if not isinstance(source, dict):
+                    break
+                if not isinstance(target.get(key), dict):
+                    target[key] = {}
+                target = target[key]
+            else:
+                if isinstance(source, dict):
+                    target[keys[-1]] = source.get(keys[-1])
+                continue
+            target.setdefault(key, source)
+        return result
+
+
+class Prefetcher(object):
+
+    # Drains an iterator (usually Paginator.iterate) on a background thread, so the
+    # next pages load while the consumer works on the first elements. Errors of
+    # the iterator are raised to the consumer. Only work done inside the iterator
+    # moves to the thread, pass a generator to also move its first request.
+
+    def __init__(self, iterable):
+        import queue
+        self.queue = queue.Queue()
+        self.stopped = False
+        self.thread = threading.Thread(target = self._run, args = (iter(iterable),), daemon = True)
+        self.thread.start()
+
+    def _run(self, iterator):
+        try:
+            for element in iterator:
+                if self.stopped:
+                    return
+                self.queue.put((element, None))
+        except Exception as e:
+            self.queue.put((None, e))
+            return
+        self.queue.put((None, None))
+
+    def __iter__(self):
+        while True:
+            element, error = self.queue.get()
+            if error is not None:
+                raise error
+            if element is None:
+                return
+            yield element
+
+    def stop(self):
+        self.stopped = True
+
+
+class IssueSelection(object):
+
+    # Issue ids given as "12", "12,15,20", "10-20" or "label:Doing" for all opened
+    # issues with that label.
+
+    def resolve(requestFactory, address, selection):
+        if selection.startswith("label:"):
+            label = Utils.encode(selection[len("label:"):])
+            issues = Paginator.fetchAll(requestFactory, address + "/issues?labels={}&state=opened&per_page={}".format(label, Paginator.MAX_PER_PAGE), fields = ["iid"])
+            return [str(issue["iid"]) for issue in issues]
+
+        issueIds = []
+        try:
+            for part in selection.split(","):
+                part = part.strip()
+                if "-" in part:
+                    first, last = part.split("-", 1)
+                    issueIds.extend(str(issueId) for issueId in range(int(first), int(last) + 1))
+                elif len(part) > 0:
+                    issueIds.append(str(int(part)))
+        except ValueError:
+            printer.out("Invalid issue selection '{}', use 12 / 12,15 / 10-20 / label:name".format(selection))
+            return None
+        return list(dict.fromkeys(issueIds))
+
+
+class BulkRunner(object):
+
+    # Runs an action for every selected issue on a bounded pool. A failing issue
+    # does not stop the others, the outcome is summed up in a table at the end.
+
+    def __init__(self, requestFactory):
+        self.concurrency = requestFactory.config.getConcurrency()
+
+    def run(self, issueIds, action):
+        if len(issueIds) == 0:
+            printer.out("No issues selected")
+            return
+        if len(issueIds) == 1:
+            try:
+                printer.out(action(issueIds[0]))
+            except Exception as e:
+                printer.out("Failed for issue {}: {}".format(issueIds[0], e))
+            return
+
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        results = {}
+        with ThreadPoolExecutor(max_workers = min(self.concurrency, len(issueIds))) as executor:
+            futures = {executor.submit(action, issueId): issueId for issueId in issueIds}
+            for done, future in enumerate(as_completed(futures)):
+                issueId = futures[future]
+                try:
+                    results[issueId] = ("ok", future.result())
+                except Exception as e:
+                    results[issueId] = ("failed", str(e))
+                failed = len([r for r in results.values() if r[0] == "failed"])
+                printer.err("\r[{}/{}] {} failed".format(done + 1, len(issueIds), failed))
+        printer.err("\n")
+
+        rows = []
+        for issueId in issueIds:
+            result, message = results[issueId]
+            rows.append([issueId, result, Util.lineBreak(" ".join(message.split()), 80)])
+        printer.out(tabulate(rows, headers = ["issue", "result", "message"]))
+        failed = len([row for row in rows if row[1] == "failed"])
+        printer.out("{} succeeded, {} failed".format(len(rows) - failed, failed))
+
 
 class ApiArg(object):
 
@@ -312,7 +1681,7 @@ class ApiArg(object):
     def isTokenArg(arg):
         return arg.startswith(ApiArg.getArgToken())
 
-    def __init__(self, token, transform = None, required = False, description = "", position = None):
+    def __init__(self, token, transform = None, required = False, description = "", position = None, query = True):
         self._token = "{}{}".format(ApiArg.getArgToken(), token)
         if transform == None:
             self._transform = token
@@ -322,6 +1691,7 @@ class ApiArg(object):
         self._required = required
         self._description = description
         self._position = position
+        self._query = query
 
     def match(self, arg):
         return arg.startswith(self._token)
@@ -357,23 +1727,40 @@ class ApiArg(object):
         return self._value
 
     def transform(self):
-        if self._value is not None:
+        if self._value is not None and self._query:
             return "{}={}".format(self._transform, self._value)
         else:
             return ""
 
 class Api(object):
 
-    def setup(self, address, requestFactory):
+    def setup(self, address, requestFactory, mirror = None, projects = None):
         self.address = address
         self.requestFactory = requestFactory
+        # set in --offline mode for apis that can read from the local mirror
+        self.mirror = mirror
+        # [(name, address)] when more than one project is configured
+        self.projects = projects
         self.helpText = ""
         self._setup()
     
 
+    _command = None
+    offline = False
+    fanOut = False
+    # params that read input or run until interrupted, the daemon leaves such
+    # calls to the client's process
+    terminal = []
+
     def _setup(self):
         self._params = []
-        self._command = None
+
+    def needsTerminal(self, args):
+        for argPosition, arg in enumerate(args):
+            for param in self._params:
+                if param.fetch(arg, argPosition):
+                    break
+        return any(param.getValue() is not None for param in self._params if param.getToken()[1:] in self.terminal)
 
     def match(self, command):
         return command == self._command   
@@ -420,13 +1807,48 @@ class Api(object):
     def addHelp(self, text):
         self.helpText += text
 
+    def forProjects(self, fetch, sortKey, reverse = False):
+        # Runs fetch(api) for every project at the same time, api being a copy of
+        # this api bound to the project's address. The elements get a "project"
+        # field and come back merged and sorted.
+        import copy
+        from concurrent.futures import ThreadPoolExecutor
+
+        def load(project):
+            name, address = project
+            api = copy.copy(self)
+            api.address = address
+            try:
+                elements = list(fetch(api))
+                for element in elements:
+                    element["project"] = name
+            except Exception as e:
+                # an error answer is a json object, not a list of elements
+                printer.err("Skipped project {}: {}\n".format(name, e))
+                return []
+            return elements
+
+        with ThreadPoolExecutor(max_workers = min(len(self.projects), 32)) as executor:
+            return sorted(itertools.chain.from_iterable(executor.map(load, self.projects)), key = sortKey, reverse = reverse)
+
+    def projectColumn(self, names):
+        return ["project"] + names if self.projects is not None else names
+
+    def projectCells(self, element, row):
+        return [element["project"]] + row if self.projects is not None else row
+
 class PipelineApi(Api):
 
+    _command = "pipes"
+    offline = True
+    fanOut = True
+    terminal = ["watch"]
+
     def _setup(self):
         self._params = [ApiArg("u", transform = "username", description="username", position = 0), \
                         ApiArg("sort", position = 1),
-                        ApiArg("n", description="number of entries", position = 2)]
-        self._command = "pipes"
+                        ApiArg("n", description="number of entries", position = 2, query = False),
+                        ApiArg("watch", description="follow the list until pipeline id (default the newest) finishes", query = False)]
 
     def testPip(self):
         return {"id": 2, "status": "good", "ref": "pi", "web_url": "test"}
@@ -434,34 +1856,154 @@ class PipelineApi(Api):
     def execute(self, args):
         if self.fetchParams(args):
             return
-        answer = self.requestFactory.get(self.getPipelines())
 
         numberOfEntries = self._params[2].getValue()
+        numberOfEntries = 20 if numberOfEntries is None else int(numberOfEntries)
+
+        if self._params[3].getValue() is not None:
+            if self.mirror is not None or self.projects is not None:
+                printer.out("-watch follows a single project online")
+                return
+            return PipelineWatch(self, numberOfEntries, self._params[3].getValue()).run()
+
+        fields = printer.projection(["id", "status", "ref", "web_url"])
+        if self.mirror is not None:
+            pipelines = self.mirror.pipelines(self._params[0].getValue(), self._params[1].getValue(), numberOfEntries)
+        elif self.projects is not None:
+            # pipeline ids grow across the whole instance, newest first over all projects
+            fetch = lambda api: itertools.islice(Paginator.iterate(api.requestFactory, api.getPipelines(), perPage = min(numberOfEntries, Paginator.MAX_PER_PAGE), fields = fields), numberOfEntries)
+            descending = self._params[1].getValue() != "asc"
+            pipelines = self.forProjects(fetch, lambda pip: pip["id"], reverse = descending)
+        else:
+            pipelines = Paginator.iterate(self.requestFactory, self.getPipelines(), perPage = min(numberOfEntries, Paginator.MAX_PER_PAGE), fields = fields)
+        pipelines = itertools.islice(pipelines, numberOfEntries)
+        if printer.records(pipelines, self.projectColumn(["id", "status", "ref", "web_url"])):
+            return
 
-        pipelines = answer.json()
-        rows = []
-        for index, pip in enumerate(pipelines):
+        table = StreamTable(self.projectColumn(['id', 'status', 'ref', 'url']))
+        for pip in pipelines:
             pipId = pip["id"]
             pipStatus = pip["status"]
             pipRef = pip["ref"]
             pipUrl = pip["web_url"]
-            rows.append([pipId, pipStatus, pipRef, pipUrl])
-            if numberOfEntries is not None and (index + 1) == int(numberOfEntries):
-                break
-        printer.out(tabulate(rows, headers=['id', 'status', 'ref', 'url']))
+            table.add(self.projectCells(pip, [pipId, pipStatus, pipRef, pipUrl]))
+        table.close()
 
     def getPipelines(self):
         return self.address + "/pipelines{}".format(self.apiArgs())
 
+class PipelineWatch(object):
+
+    # pipes -watch: polls in process with updated_after, so an idle poll asks for
+    # nothing new and comes back as 304 from the response cache. The interval is
+    # short while a pipeline is active and doubles up to MAX_INTERVAL otherwise.
+    # Only changed rows are redrawn. Exits 0 when the watched pipeline succeeds
+    # and 1 when it ends otherwise.
+
+    MIN_INTERVAL = 2
+    MAX_INTERVAL = 60
+    ACTIVE = ["created", "waiting_for_resource", "preparing", "pending", "running", "scheduled"]
+    FINISHED = ["success", "failed", "canceled", "skipped"]
+
+    def __init__(self, api, numberOfEntries, pipelineId):
+        self.api = api
+        self.requestFactory = api.requestFactory
+        self.numberOfEntries = numberOfEntries
+        self.pipelineId = int(pipelineId) if pipelineId != "" else None
+        self.rows = []
+        self.pipelines = {}
+        self.table = None
+
+    def run(self):
+        pipelines = list(itertools.islice(Paginator.iterate(self.requestFactory, self.api.getPipelines(),
+                                                            perPage = min(self.numberOfEntries, Paginator.MAX_PER_PAGE)), self.numberOfEntries))
+        if self.pipelineId is None and len(pipelines) > 0:
+            self.pipelineId = pipelines[0]["id"]
+        if self.pipelineId is None:
+            printer.out("No pipeline to watch")
+            return
+        if self.pipelineId not in [pipeline["id"] for pipeline in pipelines]:
+            answer = self.requestFactory.get(self.api.address + "/pipelines/{}".format(self.pipelineId))
+            if answer.status_code != 200:
+                printer.out("Pipeline {} not found".format(self.pipelineId))
+                return
+            pipelines.append(answer.json())
+
+        self.table = StreamTable(['id', 'status', 'ref', 'url'])
+        for pipeline in pipelines:
+            self._add(pipeline)
+        self.table.close()
+
+        interval = PipelineWatch.MIN_INTERVAL
+        try:
+            while not self._finished():
+                time.sleep(interval)
+                changed = self._poll()
+                if changed or self._active():
+                    interval = PipelineWatch.MIN_INTERVAL
+                else:
+                    interval = min(interval * 2, PipelineWatch.MAX_INTERVAL)
+        except KeyboardInterrupt:
+            sys.exit(130)
+        status = self.pipelines[self.pipelineId]["status"]
+        printer.out("Pipeline {} {}".format(self.pipelineId, status))
+        sys.exit(0 if status == "success" else 1)
+
+    def _poll(self):
+        updatedAfter = max(pipeline["updated_at"] for pipeline in self.pipelines.values())
+        endpoint = Utils.addQuery(self.api.getPipelines(), "order_by=updated_at&updated_after={}&per_page={}".format(
+            Utils.encode(updatedAfter), Paginator.MAX_PER_PAGE))
+        changed = False
+        for pipeline in Paginator._iterateFrom(self.requestFactory, endpoint, self.requestFactory.get(endpoint, revalidate = True)):
+            known = self.pipelines.get(pipeline["id"])
+            if known is None:
+                if pipeline["id"] > min(self.pipelines):
+                    self._add(pipeline)
+                    changed = True
+            elif known["status"] != pipeline["status"] or known["updated_at"] != pipeline["updated_at"]:
+                changed = changed or known["status"] != pipeline["status"]
+                self._update(pipeline, redraw = known["status"] != pipeline["status"])
+        return changed
+
+    def _row(self, pipeline):
+        return [pipeline["id"], pipeline["status"], pipeline["ref"], pipeline["web_url"]]
+
+    def _add(self, pipeline):
+        self.pipelines[pipeline["id"]] = pipeline
+        self.rows.append(pipeline["id"])
+        self.table.add(self._row(pipeline))
+
+    def _update(self, pipeline, redraw):
+        self.pipelines[pipeline["id"]] = pipeline
+        if not redraw:
+            return
+        line = self.table.formatRow(self._row(pipeline))[0]
+        if not printer.isatty():
+            printer.out(line)
+            return
+        # rewrite the row in place: up to its line, clear it, and back down
+        up = len(self.rows) - self.rows.index(pipeline["id"])
+        printer.out("\x1b[{}F\x1b[2K{}".format(up, line) + ("\x1b[{}E".format(up - 1) if up > 1 else ""))
+
+    def _active(self):
+        return any(pipeline["status"] in PipelineWatch.ACTIVE for pipeline in self.pipelines.values())
+
+    def _finished(self):
+        return self.pipelines[self.pipelineId]["status"] in PipelineWatch.FINISHED
+
+
 class IssueApi(Api):
 
+    _command = "issue"
+    offline = True
+    terminal = ["a"]
+
     def _setup(self):
         self._params = [ApiArg("iid", description="id of issue", required = True, position = 0), \
                         ApiArg("a", description="add note", position = 1), \
                         ApiArg("d", description="print discussion", position = 2), \
                         ApiArg("close", description="close issue", position = 3) \
                         ]
-        self._command = "issue"
 
     def execute(self, args):
         if self.fetchParams(args):
@@ -473,27 +2015,47 @@ class IssueApi(Api):
         closeIssue = self._params[3].getValue()
 
 
-        answer = self.requestFactory.get(self._getIssueById(issueId, False)).json()
+        if self.mirror is not None:
+            return self.printFromMirror(issueId, addNote is not None or closeIssue is not None, printDiscussion is not None)
 
         if closeIssue is not None:
             printer.out("Try to close issue")
             self.requestFactory.put(self._closeIssue(issueId))
-            answer = self.requestFactory.get(self._getIssueById(issueId, False)).json()
+
+        fetchNotes = lambda: Paginator.fetchAll(self.requestFactory, self._getIssueNotes(issueId)) if printDiscussion is not None else []
+        answer, notes = self.requestFactory.gather(lambda: self.requestFactory.get(self._getIssueById(issueId, False)).json(), fetchNotes)
 
         if addNote is not None:
             noteToAdd = input("Add a discussion note to issue \"{}\":\n>".format(answer["title"]))
             printer.out("Discussion note:\n\"{}\"".format(noteToAdd))
 
-            self.requestFactory.post(self._postIssueNote(issueId), {"body": noteToAdd})
+            note = self.requestFactory.post(self._postIssueNote(issueId), {"body": noteToAdd}).json()
+            if "body" in note:
+                notes.append(note)
 
         if printDiscussion is not None:
-            notes = Paginator.fetchAll(self.requestFactory, self._getIssueNotes(issueId))
-            
-            for note in notes:
-                author = note["author"]["username"]
-                body = note["body"]
-                printer.out("--------\nauthor {}: {}".format(author, body))
+            self.printNotes(notes)
+        self.printIssue(answer)
 
+    def printFromMirror(self, issueId, changes, printDiscussion):
+        if changes:
+            printer.out("Adding notes and closing issues is not possible with --offline")
+            return
+        answer = self.mirror.issue(issueId)
+        if answer is None:
+            printer.out("Issue {} is not in the local mirror".format(issueId))
+            return
+        if printDiscussion:
+            self.printNotes(self.mirror.notes(issueId))
+        self.printIssue(answer)
+
+    def printNotes(self, notes):
+        for note in notes:
+            author = note["author"]["username"]
+            body = note["body"]
+            printer.out("--------\nauthor {}: {}".format(author, body))
+
+    def printIssue(self, answer):
         description = answer["description"] 
         labels = answer["labels"]
         printer.out("* Description: {}".format(description))
@@ -529,12 +2091,16 @@ class StringBuilder(object):
 
 class MergeRequestApi(Api):
 
+    _command = "mr"
+    offline = True
+    fanOut = True
+    terminal = ["iid"]
+
     def _setup(self):
         self._params = [ApiArg("iid", description="id of MR", position = 0), \
                         ApiArg("a", description="add note", position = 1), \
                         ApiArg("d", description="print discussion", position = 2) \
                         ]
-        self._command = "mr"
 
     def execute(self, args):
         if self.fetchParams(args):
@@ -548,9 +2114,20 @@ class MergeRequestApi(Api):
             self.printOpenMergeRequests()
 
     def printOpenMergeRequests(self):
-        answer = self.requestFactory.get(self._getOpenMergeRequests()).json()
+        fields = printer.projection(["iid", "upvotes", "title", "author.username", "user_notes_count", "work_in_progress",
+                                     "merge_status", "web_url", "source_branch", "created_at"])
+        if self.mirror is not None:
+            answer = self.mirror.mergeRequests("opened")
+        elif self.projects is not None:
+            fetch = lambda api: Paginator.fetchAll(api.requestFactory, Utils.addQuery(api._getOpenMergeRequests(), "per_page={}".format(Paginator.MAX_PER_PAGE)), fields = fields)
+            answer = self.forProjects(fetch, lambda mr: mr["created_at"], reverse = True)
+        else:
+            answer = Paginator.stream(self.requestFactory, Utils.addQuery(self._getOpenMergeRequests(), "per_page={}".format(Paginator.MAX_PER_PAGE)), fields = fields)
         
-        rows = []
+        if printer.records(answer, self.projectColumn(["iid", "upvotes", "title", "author.username", "user_notes_count", "work_in_progress", "merge_status", "web_url"])):
+            return
+
+        table = StreamTable(self.projectColumn(["id", "👍", "title", "auth", "n", "wip" , "status", "url"]))
         for mr in answer:
             iid = mr["iid"]
             title = mr["title"]
@@ -563,12 +2140,24 @@ class MergeRequestApi(Api):
             upVotes = mr["upvotes"]
             userNotesCount = mr["user_notes_count"]
             row = [iid, upVotes, title, author, userNotesCount, workInProgress, mergeStatus, webUrl]
-            rows.append(row)
-        
-        printer.out(tabulate(rows, headers=["id", "👍", "title", "auth", "n", "wip" , "status", "url"], tablefmt="simple"))
+            table.add(self.projectCells(mr, row))
+        table.close()
 
     def printMergeRequest(self, mrId):
-        answer = self.requestFactory.get(self._getMergeRequest(mrId)).json()
+        if self.mirror is not None:
+            answer, discussions = self.mirror.mergeRequest(mrId), self.mirror.discussions(mrId)
+            if answer is None:
+                printer.out("Merge request {} is not in the local mirror".format(mrId))
+                return
+        else:
+            # the discussion pages load on a background thread while the MR is
+            # fetched and the reviewer reads, the first one shows with its page.
+            # Paginator.iterate gets the first page before it returns, so it is
+            # wrapped in a generator that only starts on the prefetch thread
+            def pages():
+                yield from Paginator.iterate(self.requestFactory, self._getMergeRequestDiscussion(mrId), perPage = Paginator.MAX_PER_PAGE)
+            discussions = Prefetcher(pages())
+            answer = self.requestFactory.get(self._getMergeRequest(mrId)).json()
         title = answer["title"]
         description = answer["description"]
         author = answer["author"]["username"]
@@ -578,22 +2167,46 @@ class MergeRequestApi(Api):
         
         printer.out("Title: {},\nDescription: {},\nAuthor: {},\nUpvotes: {},\nMR-Status: {},\nWIP: {}".format(title, description, author, upVotes, mergeStatus, workInProgress))
 
-        discussions = Paginator.fetchAll(self.requestFactory, self._getMergeRequestDiscussion(mrId))
-        for discussion in discussions:
-            discussionId = discussion["id"]
-            command = self.printSingleDiscussion(mrId, discussion)
-            if command == "continue":
-                continue
-            elif command == "break":
-                break
+        self._answers = []
+        try:
+            for discussion in discussions:
+                self._reportAnswers()
+                command = self.printSingleDiscussion(mrId, discussion)
+                if command == "continue":
+                    continue
+                elif command == "break":
+                    break
+        finally:
+            if isinstance(discussions, Prefetcher):
+                discussions.stop()
+            self._reportAnswers(wait = True)
         # TODO thumbs up
 
-    def printSingleDiscussion(self, mrId, discussion = None, discussionId = None):
-        if discussionId is not None:
-            discussion = self.requestFactory.get(self._getDiscussion(mrId, discussionId)).json()
+    def printSingleDiscussion(self, mrId, discussion):
+        text = self._discussionText(discussion)
+        if text is not None:
+            printer.out(text)
+        else:
+            return "continue"
+  
+        user_input = input("command (a - answer, n/[space] - next discussion, s - skip all)")
+        if user_input == "n" or len(user_input) == 0:
+            return "continue"
+        elif user_input == "a" and self.mirror is not None:
+            printer.out("Answering is not possible with --offline")
+        elif user_input == "a":
+            answer = input("Answer: ")
+            if len(answer) > 0:
+                self._postAnswer(mrId, discussion, answer)
+        elif user_input == "s":
+            return "break"
+
+        return ""
+
+    def _discussionText(self, discussion):
+        # None for discussions without resolvable notes, they are not reviewed
         builder = StringBuilder()
         notes = discussion["notes"]
-        discussionId = discussion["id"]
         sumResolved = 0
         sumResolvable = 0
 
@@ -606,7 +2219,6 @@ class MergeRequestApi(Api):
                 resolved = note["resolved"]
                 if resolved:
                     sumResolved += 1
-            updated_at = note["updated_at"]
 
             prefix = "    ({}): ".format(author)
             body = self.setSpaces(body, len(prefix))
@@ -616,27 +2228,38 @@ class MergeRequestApi(Api):
         allResolved = sumResolved == sumResolvable
         resolveStatus = " - resolved {}".format(allResolved) if resolvable  else ""
 
-        if resolvable:
-            printer.out("\n# Discussion {}:\n{}\n".format(resolveStatus, builder.toString()))
-        else:
-            return "continue"
-  
-        user_input = input("command (a - answer, n/[space] - next discussion, s - skip all)")
-        if user_input == "n" or len(user_input) == 0:
-            return "continue"
-        elif user_input == "a":
-            answer = input("Answer: ")
-            if len(answer) > 0:
-                response = self.requestFactory.post(self._postAnswerDiscussion(mrId, discussionId), {"body": answer}).json()
-                if "body" in response:
-                    printer.out("Success:\n{}\n\n".format(response["body"]))
-                    self.printSingleDiscussion(mrId, discussionId = discussionId)
-                else:
-                    printer.out("Error...\n\n")
-        elif user_input == "s":
-            return "break"
-
-        return ""
+        if not resolvable:
+            return None
+        return "\n# Discussion {}:\n{}\n".format(resolveStatus, builder.toString())
+
+    def _postAnswer(self, mrId, discussion, answer):
+        # The answer is posted in the background and the review goes on with the
+        # next discussion. The note in the POST response completes the discussion,
+        # it is not loaded again.
+        from concurrent.futures import ThreadPoolExecutor
+        if not hasattr(self, "_postExecutor"):
+            self._postExecutor = ThreadPoolExecutor(max_workers = 1)
+        post = lambda: self.requestFactory.post(self._postAnswerDiscussion(mrId, discussion["id"]), {"body": answer}).json()
+        self._answers.append((discussion, self._postExecutor.submit(post)))
+        printer.out("Sending answer...\n")
+
+    def _reportAnswers(self, wait = False):
+        pending = []
+        for discussion, future in self._answers:
+            if not wait and not future.done():
+                pending.append((discussion, future))
+                continue
+            try:
+                response = future.result()
+            except Exception as e:
+                response = {"message": str(e)}
+            if "body" in response:
+                printer.out("Success:\n{}\n\n".format(response["body"]))
+                discussion["notes"].append(response)
+                printer.out(self._discussionText(discussion))
+            else:
+                printer.out("Error...{}\n\n".format(response.get("message", "")))
+        self._answers = pending
 
     def setSpaces(self, text, spaces):
         spaces = [" " for i in range(spaces)]
@@ -649,9 +2272,6 @@ class MergeRequestApi(Api):
     def _postAnswerDiscussion(self, mrId, discussionId):
         return self.address + "/merge_requests/{}/discussions/{}/notes".format(mrId, discussionId)
 
-    def _getDiscussion(self, mrId, discussionId):
-        return self.address + "/merge_requests/{}/discussions/{}".format(mrId, discussionId)
-
     def _getOpenMergeRequests(self):
         return self.address + "/merge_requests?state=opened"
     
@@ -666,17 +2286,27 @@ class MergeRequestApi(Api):
 
 class BranchApi(Api):
 
+    _command = "branches"
+    fanOut = True
+
     def _setup(self):
         self._params = [ApiArg("search"), ApiArg("id")]
-        self._command = "branches"
 
     def execute(self, args):
         # args: id, search
         self.fetchParams(args)
 
-        branches = self.requestFactory.get(self.api()).json()
+        fields = printer.projection(["name", "merged", "commit.author_name", "commit.title", "commit.short_id"])
+        if self.projects is not None:
+            fetch = lambda api: Paginator.fetchAll(api.requestFactory, Utils.addQuery(api.api(), "per_page={}".format(Paginator.MAX_PER_PAGE)), fields = fields)
+            branches = self.forProjects(fetch, lambda branch: (branch["name"], branch["project"]))
+        else:
+            branches = Paginator.stream(self.requestFactory, Utils.addQuery(self.api(), "per_page={}".format(Paginator.MAX_PER_PAGE)), fields = fields)
         
-        rows = []
+        if printer.records(branches, self.projectColumn(["name", "merged", "commit.author_name", "commit.title", "commit.short_id"])):
+            return
+
+        table = StreamTable(self.projectColumn(["name", "merged", "author", "commit", "hash"]))
         for branch in branches:
             name = branch["name"]
             merged = branch["merged"]
@@ -684,20 +2314,20 @@ class BranchApi(Api):
             commitTitle = branch["commit"]["title"]
             commitShort = branch["commit"]["short_id"]
             row = [name, merged, authorName, commitTitle, commitShort]
-            rows.append(row)
-
-        printer.out(tabulate(rows, headers = ["name", "merged", "author", "commit", "hash"]))
+            table.add(self.projectCells(branch, row))
+        table.close()
 
     def api(self):
         return self.address + "/repository/branches{}".format(self.apiArgs())
 
 class LabelsApi(Api):
 
+    _command = "lab"
+
     def _setup(self):
         self._params = [ApiArg("o", description = "operation", position = 0, required = True), \
-                        ApiArg("id", description = "issue id", position = 1, required = True), \
+                        ApiArg("id", description = "issue ids (1,2,5-9 or label:name)", position = 1, required = True), \
                         ApiArg("name", description =  "label name", position = 2, required = True)]
-        self._command = "lab"
         self.addHelp("Add/remove labels")
 
     def execute(self, args):
@@ -705,7 +2335,7 @@ class LabelsApi(Api):
             return
 
         operation = self._params[0].getValue()
-        issueId = self._params[1].getValue()
+        selection = self._params[1].getValue()
         labelName = self._params[2].getValue()
 
         splitted = labelName.split(",")
@@ -714,165 +2344,93 @@ class LabelsApi(Api):
         if not (operation == "add" or operation == "rm"):
             return printer.out("Operation not supported {}. Supported operations: add/rm".format(operation))
 
-        # Get labels for issue
-        issueAnswer = self.requestFactory.get(self._apiGetIssueById(issueId, True)).json()
-        if "labels" not in issueAnswer:
-            printer.out("Failed to get labels for issue {}: {}".format(issueId, issueAnswer))
+        issueIds = IssueSelection.resolve(self.requestFactory, self.address, selection)
+        if issueIds is None:
             return
+        BulkRunner(self.requestFactory).run(issueIds, lambda issueId: self.changeLabels(issueId, operation, splitted))
 
-        labels = issueAnswer["labels"]
-        printer.out("Current labels {}".format(labels))
-        if(operation == "add"):
-            [labels.append(x) for x in splitted]
-        elif operation == "rm":
-            [labels.remove(x) for x in splitted]
+    def changeLabels(self, issueId, operation, splitted):
+        # one PUT, the answer already is the issue after the change
+        if operation == "add":
+            endpoint = self._apiPutLabelChanges(issueId, add = splitted)
+        else:
+            endpoint = self._apiPutLabelChanges(issueId, remove = splitted)
 
-        setLabelsAnswer = self.requestFactory.put(self._apiPutLabelsToIssue(issueId, labels)).json()
+        setLabelsAnswer = self.requestFactory.put(endpoint).json()
         if "id" not in setLabelsAnswer:
-            printer.out("Failed to move issue {}".format(setLabelsAnswer))
-
-        idFromAnswer = setLabelsAnswer["iid"]
-
-        issueAnswer = self.requestFactory.get(self._apiGetIssueById(idFromAnswer, True)).json()
-        if "id" in issueAnswer:
-            title = issueAnswer["title"]
-            labels = issueAnswer["labels"]
-            assignees = [assignee["username"] for assignee in issueAnswer["assignees"]]
-            printer.out("Issue: {}\n -> labels: {}\n -> assignees: {}".format(title, labels, assignees))
-
-    def _apiGetIssueById(self, issueId, opened):
-        op = ""
-        if opened:
-            op = "?state=opened"
-        return self.address + "/issues/{}{}".format(issueId, op)
+            raise GitlabError("Failed to set labels {}".format(setLabelsAnswer))
+        return Utils.issueSummary(setLabelsAnswer)
 
-    def _apiPutLabelsToIssue(self, issueIid, labelsArray):
-        labelsArray = [Utils.encode(e) for e in labelsArray]
-        serializedLables = ",".join(labelsArray)
-        return self.address + "/issues/{}?labels={}".format(issueIid, serializedLables)
+    def _apiPutLabelChanges(self, issueIid, add = [], remove = []):
+        return Utils.labelChanges(self.address + "/issues/{}".format(issueIid), add, remove)
 
 class IssueMoveApi(Api):
 
+    _command = "move"
+
     def _setup(self):
-        self._params = [ApiArg("i", description = "issue id", position = 0, required = True), \
+        self._params = [ApiArg("i", description = "issue ids (1,2,5-9 or label:name)", position = 0, required = True), \
                         ApiArg("s", description = "source list", position = 1, required = True), \
                         ApiArg("t", description =  "target list", position = 2, required = True), \
                         ApiArg("u", description =  "username"), \
                         ApiArg("x", description = "unassign all users")]
-        self._command = "move"
         self.addHelp("Move issue from list s to list t and assign to user u")
 
     def execute(self, args):
         if self.fetchParams(args):
             return
 
-        issue = self._params[0].getValue()
+        selection = self._params[0].getValue()
         source = self._params[1].getValue()
         target = self._params[2].getValue()
-        assignUser = self._params[3].getValue() is not None
+        userName = self._params[3].getValue()
         unassign = self._params[4].getValue() is not None
 
-        issueIdSaved = self.moveToPanel(issue, target)
-        if issueIdSaved is None:
-            return
-        if assignUser:
-            self.assignToUser(issueIdSaved, self._params[3].getValue())
-        if unassign:
-            self.unassignIssue(issueIdSaved)
-
-        issueAnswer = self.requestFactory.get(self._apiGetIssueById(issue, True)).json()
-        if "id" in issueAnswer:
-            title = issueAnswer["title"]
-            labels = issueAnswer["labels"]
-            assignees = [assignee["username"] for assignee in issueAnswer["assignees"]]
-            printer.out("Issue: {}\n -> labels: {}\n -> assignees: {}".format(title, labels, assignees))
-
-
-    def moveToPanel(self, issueId, labelName):
-        answer = self.requestFactory.get(self._apiGetProjectBoards())
-        allLabels = []
-        boards = answer.json()
-        for b in boards:
-            lists = b["lists"]
-            for list in lists:
-                allLabels.append(list["label"]["name"])
-            
-        if labelName not in allLabels:
-            printer.out("List {} not known.\nKnown lists {}".format(labelName, allLabels))
-            return
-        
-        # Get labels for issue, remove label of old board list and add new labelName
-        issueAnswer = self.requestFactory.get(self._apiGetIssueById(issueId, True)).json()
-        if "labels" not in issueAnswer:
-            printer.out("Failed to get labels for issue {}: {}".format(issueId, issueAnswer))
+        self.boardLabels = BoardLabels.shared(self.requestFactory, self.address)
+        if not self.boardLabels.contains(target):
+            printer.out("List {} not known.\nKnown lists {}".format(target, sorted(self.boardLabels.labels())))
             return
 
-        labels = issueAnswer["labels"]
-        numberOfLabelsBefore = len(labels)
-        for panelLabel in allLabels:
-            if panelLabel in labels:
-                labels.remove(panelLabel)
-
-        
-        labels.append(labelName)  
-        assert numberOfLabelsBefore == len(labels)
-        printer.out("Set labels {}".format(labels))
-        setLabelsAnswer = self.requestFactory.put(self._apiPutLabelsToIssue(issueId, labels)).json()
-        if "id" not in setLabelsAnswer:
-            printer.out("Failed to move issue {}".format(setLabelsAnswer))
-        return setLabelsAnswer["iid"]
-            
-    def assignToUser(self, issueId, userName):
-        answer = self.requestFactory.get(self._apiGetUsersByName(userName))
-        users = answer.json()
-        
-        foundUser = None
-        for user in users:
-            if user["username"] == userName:
-                foundUser = user
-                break
+        userId = None
+        if userName is not None:
+            userId = UserDirectory.shared(self.requestFactory, self.address).find(userName)
+            if userId is None:
+                printer.out("User not found: '{}' registered?".format(userName))
+                return
 
-        if foundUser is None:
-            printer.out("User not found: '{}' registered?".format(userName))
+        issueIds = IssueSelection.resolve(self.requestFactory, self.address, selection)
+        if issueIds is None:
             return
-        
-        assignAnswer = self.requestFactory.put(self._apiPutAssignIssue(issueId, foundUser["id"])).json()
-        if "id" not in assignAnswer:
-            printer.out("Failed to assign issue {}".format(assignAnswer))
-    
-    def unassignIssue(self, issueId):
-        answer = self.requestFactory.put(self._apiPutAssignIssue(issueId, "0")).json()
-        if "id" not in answer:
-            printer.out("Failed to unassign {}".format(answer))
+        BulkRunner(self.requestFactory).run(issueIds, lambda issueId: self.moveIssue(issueId, target, userId, unassign))
 
+    def moveIssue(self, issueId, target, userId, unassign):
+        # the other list labels go, the target comes and the assignee changes in
+        # the same PUT, its answer is the moved issue
+        otherLabels = sorted(self.boardLabels.labels() - {target})
+        endpoint = self._apiPutLabelChanges(issueId, add = [target], remove = otherLabels)
+        if unassign:
+            endpoint = Utils.addQuery(endpoint, "assignee_ids=0")
+        elif userId is not None:
+            endpoint = Utils.addQuery(endpoint, "assignee_ids={}".format(userId))
 
-    def _apiGetProjectBoards(self):
-       return self.address + "/boards"
-
-    def _apiGetIssueById(self, issueId, opened):
-        op = ""
-        if opened:
-            op = "?state=opened"
-        return self.address + "/issues/{}{}".format(issueId, op)
-
-    def _apiPutLabelsToIssue(self, issueIid, labelsArray):
-        labelsArray = [Utils.encode(e) for e in labelsArray]
-        serializedLables = ",".join(labelsArray)
-        return self.address + "/issues/{}?labels={}".format(issueIid, serializedLables)
+        issueAnswer = self.requestFactory.put(endpoint).json()
+        if "id" not in issueAnswer:
+            raise GitlabError("Failed to move issue {}".format(issueAnswer))
+        return Utils.issueSummary(issueAnswer)
 
-    def _apiGetUsersByName(self, userName):
-        return self.address + "/users?username={}".format(userName)
-
-    def _apiPutAssignIssue(self, issueId, userId):
-        return self.address + "/issues/{}?assignee_ids={}".format(issueId, userId)
+    def _apiPutLabelChanges(self, issueIid, add = [], remove = []):
+        return Utils.labelChanges(self.address + "/issues/{}".format(issueIid), add, remove)
 
 
 class BoardApi(Api):
 
+    _command = "board"
+    offline = True
+    fanOut = True
+
     def _setup(self):
         self._params = [ApiArg("list", description = "list name", position = 0), \
                         ApiArg("u", description = "username", position = 1)]
-        self._command = "board"
 
     def execute(self, args):
         if self.fetchParams(args):
@@ -885,9 +2443,21 @@ class BoardApi(Api):
             self.printBoard()
 
     def _printList(self, labelName, username = None):
-        issues = Paginator.fetchAll(self.requestFactory, self._apiGetIssueWithLabels([labelName]))
+        fields = printer.projection(["iid", "title", "labels", "assignee.username", "created_at"])
+        if self.mirror is not None:
+            issues = self.mirror.issues(label = labelName, state = "opened")
+        elif self.projects is not None:
+            fetch = lambda api: Paginator.fetchAll(api.requestFactory, api._apiGetIssueWithLabels([labelName]), fields = fields)
+            issues = self.forProjects(fetch, lambda issue: issue["created_at"], reverse = True)
+        else:
+            issues = Paginator.stream(self.requestFactory, self._apiGetIssueWithLabels([labelName]), fields = fields)
         
-        issueRows = []
+        if username is not None:
+            issues = (issue for issue in issues if issue["assignee"] is not None and issue["assignee"]["username"] == username)
+        if printer.records(issues, self.projectColumn(["iid", "title", "labels", "assignee.username"])):
+            return
+
+        table = StreamTable(self.projectColumn(['id', 'title', 'labels', 'assigned to']))
         for issue in issues:
             issueId = issue["iid"]
             issueTitle = issue["title"]
@@ -895,31 +2465,27 @@ class BoardApi(Api):
             issueAssigns = issue["assignee"]
             if issueAssigns is not None:
                 issueAssigns = issue["assignee"]["username"]
-
-            if username is not None:
-                if username != issueAssigns:
-                    continue
-            issueRows.append([issueId, issueTitle, issueLabels, issueAssigns])
-            
-        printer.out(tabulate(issueRows, headers=['id', 'title', 'labels', 'assigned to']))
+            table.add(self.projectCells(issue, [issueId, issueTitle, issueLabels, issueAssigns]))
+        table.close()
 
 
     def _apiGetIssueWithLabels(self, labels):
         labels = ",".join(labels)
-        return self.address + "/issues?labels={}&state=opened".format(labels)
+        return self.address + "/issues?labels={}&state=opened&per_page={}".format(labels, Paginator.MAX_PER_PAGE)
 
     def printBoard(self):
-        boards = self.requestFactory.get(self._apiBoard()).json()
+        if self.mirror is None and self.requestFactory.config.getBoardBackend() == "graphql":
+            boards = GraphqlBoardLoader(self.requestFactory, self.address).load()
+        else:
+            boards = BoardLoader(self.requestFactory, self.address, self.mirror).load()
 
-        for board in boards:
-            lists = board["lists"]
+        for board, columns in boards:
             boardTable = []
             maxSize = 0
             listNames = []
-            for listItem in lists:
-                listName = listItem["label"]["name"]
+            for listName, issues in columns:
                 listNames.append(listName)
-                issueList = self.getIssuesByLabel(listName)
+                issueList = ["({}): {}".format(issue["id"], issue["title"]) for issue in issues]
                 boardTable.append(issueList)
                 if len(issueList) > maxSize:
                     maxSize = len(issueList)
@@ -935,73 +2501,987 @@ class BoardApi(Api):
             printer.out("----------\nBoard: {}\n----------".format(board["id"]))
             printer.out(tabulate(rows, headers = listNames))
 
-    def getIssuesByLabel(self, labelName):
-        issues = self.requestFactory.get(self.address + "/issues?labels={}".format(labelName)).json()
-        issues = ["({}): {}".format(issue["id"], issue["title"]) for issue in issues]
-        return issues
+
+class BoardLoader(object):
+
+    # Loads all opened issues in one paginated pass and sorts them into the board
+    # lists locally, the number of requests does not depend on the number of lists.
+
+    def __init__(self, requestFactory, address, mirror = None):
+        self.requestFactory = requestFactory
+        self.address = address
+        self.mirror = mirror
+
+    def load(self):
+        if self.mirror is not None:
+            boards, index = self.mirror.boards(), self._index(self.mirror.issues(state = "opened"))
+        else:
+            boards, index = self.requestFactory.gather(lambda: self.requestFactory.get(self._apiBoard()).json(), self.labelIndex)
+
+        result = []
+        for board in boards:
+            columns = []
+            for listItem in board["lists"]:
+                listName = listItem["label"]["name"]
+                columns.append((listName, index.get(listName, [])))
+            result.append((board, columns))
+        return result
+
+    def labelIndex(self):
+        # the board only shows id and title, the rest of every issue is dropped while decoding
+        return self._index(Paginator.fetchAll(self.requestFactory, self._apiOpenedIssues(), fields = ["id", "iid", "title", "labels"]))
+
+    def _index(self, issues):
+        index = {}
+        for issue in issues:
+            for label in issue["labels"]:
+                index.setdefault(label, []).append(issue)
+        return index
+
+    def _apiBoard(self):
+        return self.address + "/boards"
+
+    def _apiOpenedIssues(self):
+        return self.address + "/issues?state=opened&per_page={}".format(Paginator.MAX_PER_PAGE)
+
+
+class GraphqlBoardLoader(object):
+
+    # Same result as BoardLoader from the GraphQL API: one query returns every board
+    # with its lists and the first page of each list's issues. Lists with more
+    # issues are continued by cursor, all of them in one multiplexed request per
+    # round. Falls back to BoardLoader when GraphQL is not available.
+
+    PAGE_SIZE = 100
+
+    ISSUE_FIELDS = """
+        fragment boardIssue on Issue {
+            id iid title
+            labels { nodes { title } }
+            assignees { nodes { username } }
+        }"""
+
+    SNAPSHOT = """
+        query boardSnapshot($fullPath: ID!, $first: Int!) {
+            project(fullPath: $fullPath) {
+                boards {
+                    nodes {
+                        id name
+                        lists {
+                            nodes {
+                                id listType
+                                label { title }
+                                issues(first: $first) {
+                                    pageInfo { hasNextPage endCursor }
+                                    nodes { ...boardIssue }
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        }""" + ISSUE_FIELDS
+
+    LIST_PAGE = """
+        query boardListIssues($id: ListID!, $after: String, $first: Int!) {
+            boardList(id: $id) {
+                issues(first: $first, after: $after) {
+                    pageInfo { hasNextPage endCursor }
+                    nodes { ...boardIssue }
+                }
+            }
+        }""" + ISSUE_FIELDS
+
+    def __init__(self, requestFactory, address):
+        self.requestFactory = requestFactory
+        self.address = address
+        self.endpoint = requestFactory.config.getGraphqlAddress()
+
+    def load(self):
+        try:
+            return self._load()
+        except (GitlabError, ValueError, KeyError) as e:
+            # ValueError/KeyError: no json or not the expected schema
+            tracer.note("graphql board failed, using REST: {}".format(e))
+            return BoardLoader(self.requestFactory, self.address).load()
+
+    def _load(self):
+        variables = {"fullPath": self._projectPath(), "first": GraphqlBoardLoader.PAGE_SIZE}
+        project = self._query([("boardSnapshot", GraphqlBoardLoader.SNAPSHOT, variables)])[0]["project"]
+        if project is None:
+            raise GitlabError("project {} not found".format(variables["fullPath"]))
+
+        result = []
+        pending = []
+        for boardNode in project["boards"]["nodes"]:
+            board = {"id": GraphqlBoardLoader._numericId(boardNode["id"]), "name": boardNode["name"], "lists": []}
+            columns = []
+            for listNode in boardNode["lists"]["nodes"]:
+                if listNode["label"] is None:
+                    # backlog and closed lists are not part of the REST board either
+                    continue
+                listName = listNode["label"]["title"]
+                board["lists"].append({"id": GraphqlBoardLoader._numericId(listNode["id"]), "label": {"name": listName}})
+                issues = []
+                columns.append((listName, issues))
+                pending.append((listNode["id"], issues, listNode["issues"]))
+            result.append((board, columns))
+
+        while len(pending) > 0:
+            more = []
+            for listId, issues, page in pending:
+                issues.extend(GraphqlBoardLoader._issue(node) for node in page["nodes"])
+                if page["pageInfo"]["hasNextPage"]:
+                    more.append((listId, issues, page["pageInfo"]["endCursor"]))
+            if len(more) == 0:
+                break
+            operations = [("boardListIssues", GraphqlBoardLoader.LIST_PAGE,
+                           {"id": listId, "after": cursor, "first": GraphqlBoardLoader.PAGE_SIZE}) for listId, issues, cursor in more]
+            pages = self._query(operations)
+            pending = [(listId, issues, data["boardList"]["issues"]) for (listId, issues, cursor), data in zip(more, pages)]
+        return result
+
+    def _query(self, operations):
+        payload = [{"operationName": name, "query": query, "variables": variables} for name, query, variables in operations]
+        answer = self.requestFactory.graphql(self.endpoint, payload if len(payload) > 1 else payload[0])
+        if answer.status_code != 200:
+            raise GitlabError("status {}".format(answer.status_code))
+        results = answer.json()
+        if not isinstance(results, list):
+            results = [results]
+        for result in results:
+            if result.get("errors"):
+                raise GitlabError(result["errors"][0].get("message"))
+        return [result["data"] for result in results]
+
+    def _projectPath(self):
+        path = self.requestFactory.config.getProjectPath()
+        if path is None:
+            answer = self.requestFactory.get(self.address)
+            if answer.status_code != 200:
+                raise GitlabError("project lookup failed with status {}".format(answer.status_code))
+            path = answer.json()["path_with_namespace"]
+        return path
+
+    def _numericId(globalId):
+        return int(globalId.rsplit("/", 1)[-1])
+
+    def _issue(node):
+        # shaped like the REST issue as far as the board uses it
+        assignees = node["assignees"]["nodes"]
+        return {"id": GraphqlBoardLoader._numericId(node["id"]), "iid": int(node["iid"]), "title": node["title"],
+                "labels": [label["title"] for label in node["labels"]["nodes"]],
+                "assignees": assignees, "assignee": assignees[0] if len(assignees) > 0 else None}
+
+
+class Mirror(object):
+
+    # Local SQLite copy of the project's issues, notes, merge requests, discussions,
+    # pipelines and boards, filled by the sync command and read with --offline.
+    # Every row keeps the API json, the columns next to it are for filtering.
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS issues (iid INTEGER PRIMARY KEY, state TEXT, assignee TEXT, created_at TEXT, updated_at TEXT, data TEXT);
+        CREATE TABLE IF NOT EXISTS issue_labels (iid INTEGER, label TEXT);
+        CREATE TABLE IF NOT EXISTS notes (issue_iid INTEGER, id INTEGER, created_at TEXT, data TEXT);
+        CREATE TABLE IF NOT EXISTS merge_requests (iid INTEGER PRIMARY KEY, state TEXT, author TEXT, created_at TEXT, updated_at TEXT, data TEXT);
+        CREATE TABLE IF NOT EXISTS discussions (mr_iid INTEGER, position INTEGER, data TEXT);
+        CREATE TABLE IF NOT EXISTS pipelines (id INTEGER PRIMARY KEY, status TEXT, ref TEXT, username TEXT, updated_at TEXT, data TEXT);
+        CREATE TABLE IF NOT EXISTS boards (data TEXT);
+        CREATE TABLE IF NOT EXISTS sync_state (resource TEXT PRIMARY KEY, updated_after TEXT);
+        CREATE INDEX IF NOT EXISTS issues_state ON issues (state, created_at);
+        CREATE INDEX IF NOT EXISTS issues_assignee ON issues (assignee);
+        CREATE INDEX IF NOT EXISTS issue_labels_label ON issue_labels (label, iid);
+        CREATE INDEX IF NOT EXISTS issue_labels_iid ON issue_labels (iid);
+        CREATE INDEX IF NOT EXISTS notes_issue ON notes (issue_iid, created_at);
+        CREATE INDEX IF NOT EXISTS merge_requests_state ON merge_requests (state, created_at);
+        CREATE INDEX IF NOT EXISTS discussions_mr ON discussions (mr_iid, position);
+        CREATE INDEX IF NOT EXISTS pipelines_ref ON pipelines (ref);
+        CREATE INDEX IF NOT EXISTS pipelines_status ON pipelines (status);
+        CREATE INDEX IF NOT EXISTS pipelines_username ON pipelines (username);
+    """
+
+    def path(configuration, address):
+        name = hashlib.sha1(address.encode("utf-8")).hexdigest()
+        return os.path.join(configuration.getCacheDir(), "mirror", name + ".sqlite")
+
+    def __init__(self, path):
+        import sqlite3
+        Utils.privateDirectory(os.path.dirname(path))
+        # created 0600 before sqlite opens it, its journal files take the same mode
+        os.close(os.open(path, os.O_WRONLY | os.O_CREAT, 0o600))
+        self.db = sqlite3.connect(path)
+        self.db.executescript(Mirror.SCHEMA)
+
+    def _rows(self, sql, args = ()):
+        return [json.loads(row[0]) for row in self.db.execute(sql, args)]
+
+    def issues(self, label = None, state = None, assignee = None):
+        sql = "SELECT data FROM issues WHERE 1 = 1"
+        args = []
+        if label is not None:
+            sql += " AND iid IN (SELECT iid FROM issue_labels WHERE label = ?)"
+            args.append(label)
+        if state is not None:
+            sql += " AND state = ?"
+            args.append(state)
+        if assignee is not None:
+            sql += " AND assignee = ?"
+            args.append(assignee)
+        return self._rows(sql + " ORDER BY created_at DESC", args)
+
+    def issue(self, iid):
+        rows = self._rows("SELECT data FROM issues WHERE iid = ?", (int(iid),))
+        return rows[0] if len(rows) > 0 else None
+
+    def notes(self, iid):
+        return self._rows("SELECT data FROM notes WHERE issue_iid = ? ORDER BY created_at, id", (int(iid),))
+
+    def mergeRequests(self, state):
+        return self._rows("SELECT data FROM merge_requests WHERE state = ? ORDER BY created_at DESC", (state,))
+
+    def mergeRequest(self, iid):
+        rows = self._rows("SELECT data FROM merge_requests WHERE iid = ?", (int(iid),))
+        return rows[0] if len(rows) > 0 else None
+
+    def discussions(self, iid):
+        return self._rows("SELECT data FROM discussions WHERE mr_iid = ? ORDER BY position", (int(iid),))
+
+    def pipelines(self, username = None, sort = None, limit = 20):
+        sql = "SELECT data FROM pipelines"
+        args = []
+        if username is not None:
+            sql += " WHERE username = ?"
+            args.append(username)
+        sql += " ORDER BY id {} LIMIT ?".format("ASC" if sort == "asc" else "DESC")
+        args.append(limit)
+        return self._rows(sql, args)
+
+    def pipelineUsers(self):
+        # the user of a pipeline never changes, a re-synced pipeline keeps it
+        return {row[0]: json.loads(row[1]) for row in self.db.execute(
+            "SELECT id, json_extract(data, '$.user') FROM pipelines WHERE username IS NOT NULL")}
+
+    def boards(self):
+        rows = self._rows("SELECT data FROM boards")
+        return rows[0] if len(rows) > 0 else []
+
+    def updatedAfter(self, resource):
+        row = self.db.execute("SELECT updated_after FROM sync_state WHERE resource = ?", (resource,)).fetchone()
+        return row[0] if row is not None else None
+
+    def setUpdatedAfter(self, resource, elements):
+        latest = max([element["updated_at"] for element in elements] + [self.updatedAfter(resource) or ""])
+        if latest != "":
+            self.db.execute("INSERT OR REPLACE INTO sync_state VALUES (?, ?)", (resource, latest))
+
+    def clear(self):
+        for table in ["issues", "issue_labels", "notes", "merge_requests", "discussions", "pipelines", "boards", "sync_state"]:
+            self.db.execute("DELETE FROM {}".format(table))
+
+    def setBoards(self, boards):
+        self.db.execute("DELETE FROM boards")
+        self.db.execute("INSERT INTO boards VALUES (?)", (json.dumps(boards),))
+
+    def storeIssues(self, issues):
+        for issue in issues:
+            assignee = issue["assignee"]["username"] if issue.get("assignee") else None
+            self.db.execute("INSERT OR REPLACE INTO issues VALUES (?, ?, ?, ?, ?, ?)",
+                            (issue["iid"], issue["state"], assignee, issue["created_at"], issue["updated_at"], json.dumps(issue)))
+            self.db.execute("DELETE FROM issue_labels WHERE iid = ?", (issue["iid"],))
+            self.db.executemany("INSERT INTO issue_labels VALUES (?, ?)", [(issue["iid"], label) for label in issue["labels"]])
+
+    def storeNotes(self, iid, notes):
+        self.db.execute("DELETE FROM notes WHERE issue_iid = ?", (iid,))
+        self.db.executemany("INSERT INTO notes VALUES (?, ?, ?, ?)", [(iid, note["id"], note["created_at"], json.dumps(note)) for note in notes])
+
+    def storeMergeRequests(self, mergeRequests):
+        for mr in mergeRequests:
+            self.db.execute("INSERT OR REPLACE INTO merge_requests VALUES (?, ?, ?, ?, ?, ?)",
+                            (mr["iid"], mr["state"], mr["author"]["username"], mr["created_at"], mr["updated_at"], json.dumps(mr)))
+
+    def storeDiscussions(self, iid, discussions):
+        self.db.execute("DELETE FROM discussions WHERE mr_iid = ?", (iid,))
+        self.db.executemany("INSERT INTO discussions VALUES (?, ?, ?)", [(iid, position, json.dumps(d)) for position, d in enumerate(discussions)])
+
+    def storePipelines(self, pipelines):
+        for pipeline in pipelines:
+            username = pipeline["user"]["username"] if pipeline.get("user") else None
+            self.db.execute("INSERT OR REPLACE INTO pipelines VALUES (?, ?, ?, ?, ?, ?)",
+                            (pipeline["id"], pipeline["status"], pipeline["ref"], username, pipeline["updated_at"], json.dumps(pipeline)))
+
+    def commit(self):
+        self.db.commit()
+
+
+class SyncApi(Api):
+
+    _command = "sync"
+
+    def _setup(self):
+        self._params = [ApiArg("full", description = "reload everything instead of the changes since the last sync", position = 0)]
+        self.addHelp("Mirror issues, MRs and pipelines into the local database used by --offline")
+
+    def execute(self, args):
+        if self.fetchParams(args):
+            return
+
+        mirror = Mirror(Mirror.path(self.requestFactory.config, self.address))
+        if self._params[0].getValue() is not None:
+            mirror.clear()
+
+        boards = self.requestFactory.get(self.address + "/boards").json()
+        mirror.setBoards(boards)
+
+        issues = self._changed(mirror, "issues", "/issues?order_by=updated_at&sort=asc")
+        mirror.storeIssues(issues)
+        for iid, notes in self._fetchEach(issues, "/issues/{}/notes?sort=asc"):
+            mirror.storeNotes(iid, notes)
+        mirror.setUpdatedAfter("issues", issues)
+        mirror.commit()
+
+        mergeRequests = self._changed(mirror, "merge_requests", "/merge_requests?order_by=updated_at&sort=asc")
+        mirror.storeMergeRequests(mergeRequests)
+        for iid, discussions in self._fetchEach(mergeRequests, "/merge_requests/{}/discussions"):
+            mirror.storeDiscussions(iid, discussions)
+        mirror.setUpdatedAfter("merge_requests", mergeRequests)
+        mirror.commit()
+
+        pipelines = self._changed(mirror, "pipelines", "/pipelines?order_by=updated_at&sort=asc")
+        # the list has no user, only the single pipeline tells who ran it (pipes -u),
+        # it is asked for the pipelines the mirror does not know yet
+        users = mirror.pipelineUsers()
+        get = lambda endpoint: self.requestFactory.get(endpoint).json()
+        for pipelineId, single in self._fetchEach([p for p in pipelines if p["id"] not in users], "/pipelines/{}", key = "id", fetch = get):
+            users[pipelineId] = single.get("user")
+        for pipeline in pipelines:
+            pipeline["user"] = users.get(pipeline["id"])
+        mirror.storePipelines(pipelines)
+        mirror.setUpdatedAfter("pipelines", pipelines)
+        mirror.commit()
+
+        printer.out("Synced {} issues, {} merge requests, {} pipelines".format(len(issues), len(mergeRequests), len(pipelines)))
+
+    def _changed(self, mirror, resource, endpoint):
+        endpoint = self.address + endpoint + "&per_page={}".format(Paginator.MAX_PER_PAGE)
+        updatedAfter = mirror.updatedAfter(resource)
+        if updatedAfter is not None:
+            endpoint += "&updated_after={}".format(Utils.encode(updatedAfter))
+        return Paginator.fetchAll(self.requestFactory, endpoint)
+
+    def _fetchEach(self, elements, endpoint, key = "iid", fetch = None):
+        # notes/discussions (or details) of every changed element, fetched in
+        # parallel and stored by the caller on this thread
+        from concurrent.futures import ThreadPoolExecutor
+        if fetch is None:
+            fetch = lambda endpoint: Paginator.fetchAll(self.requestFactory, endpoint)
+        iids = [element[key] for element in elements]
+        if len(iids) == 0:
+            return []
+        with ThreadPoolExecutor(max_workers = self.requestFactory.config.getConcurrency()) as executor:
+            return list(zip(iids, executor.map(lambda iid: fetch(self.address + endpoint.format(iid)), iids)))
+
+
+class BoardLabels(object):
+
+    # Labels of all board lists. They rarely change, so they are kept on disk for
+    # board-ttl seconds and reloaded early only when a label is not found.
+
+    def shared(requestFactory, address):
+        # one instance per request factory, a daemon keeps the labels in memory
+        return requestFactory.shared(("boardLabels", address), lambda: BoardLabels(requestFactory, address))
+
+    def __init__(self, requestFactory, address):
+        self.requestFactory = requestFactory
+        self.address = address
+        self.ttl = requestFactory.config.getBoardTtl()
+        self._labels = None
+        self._loaded = 0
+        self._fetched = False
+
+    def labels(self):
+        if self._labels is None:
+            self._read()
+        if self._labels is None or time.time() - self._loaded >= self.ttl:
+            self.refresh()
+        return self._labels
+
+    def contains(self, label):
+        if label in self.labels():
+            return True
+        if not self._fetched:
+            self.refresh()
+        return label in self._labels
+
+    def refresh(self):
+        boards = self.requestFactory.get(self._apiBoard(), revalidate = True).json()
+        self._labels = set()
+        for board in boards:
+            for listItem in board["lists"]:
+                self._labels.add(listItem["label"]["name"])
+        self._loaded = time.time()
+        self._fetched = True
+        self._write()
+
+    def _path(self):
+        cache = self.requestFactory.cache
+        if cache is None:
+            return None
+        name = hashlib.sha1((cache.identity + self.address).encode("utf-8")).hexdigest()
+        return os.path.join(self.requestFactory.config.getCacheDir(), "boards", name + ".json")
+
+    def _read(self):
+        path = self._path()
+        if path is None or self.requestFactory.cache.refresh:
+            return
+        try:
+            with open(path, "r") as file:
+                data = json.load(file)
+            self._labels = set(data["labels"])
+            self._loaded = data["loaded"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def _write(self):
+        path = self._path()
+        if path is None:
+            return
+        try:
+            Utils.privateDirectory(os.path.dirname(path))
+            with Utils.openPrivate(path + ".tmp") as file:
+                json.dump({"labels": sorted(self._labels), "loaded": self._loaded}, file)
+            os.replace(path + ".tmp", path)
+        except OSError:
+            pass
 
     def _apiBoard(self):
         return self.address + "/boards"
 
 
+class UserDirectory(object):
+
+    # Username to id of all project members, inherited ones included, read in
+    # one paginated pass and kept on disk for user-ttl seconds. A name that is
+    # not a member is looked up on its own and added, so bulk assignments and
+    # moves with -u need no request per issue.
+
+    def shared(requestFactory, address):
+        return requestFactory.shared(("userDirectory", address), lambda: UserDirectory(requestFactory, address))
+
+    def __init__(self, requestFactory, address):
+        self.requestFactory = requestFactory
+        self.address = address
+        self.ttl = requestFactory.config.getUserTtl()
+        self._users = None
+        self._loaded = 0
+        self._lock = threading.Lock()
+
+    def find(self, userName):
+        with self._lock:
+            if self._users is None:
+                self._read()
+            if self._users is None or time.time() - self._loaded >= self.ttl:
+                self.refresh()
+            if userName not in self._users:
+                self._lookup(userName)
+            return self._users.get(userName)
+
+    def refresh(self):
+        members = Paginator.fetchAll(self.requestFactory, self._apiMembers(), fields = ["id", "username"])
+        self._users = {member["username"]: member["id"] for member in members}
+        self._loaded = time.time()
+        self._write()
+
+    def _lookup(self, userName):
+        users = self.requestFactory.get(self._apiGetUsersByName(userName)).json()
+        for user in users:
+            if user["username"] == userName:
+                self._users[userName] = user["id"]
+                self._write()
+                return
+
+    def _path(self):
+        cache = self.requestFactory.cache
+        if cache is None:
+            return None
+        name = hashlib.sha1((cache.identity + self.address).encode("utf-8")).hexdigest()
+        return os.path.join(self.requestFactory.config.getCacheDir(), "users", name + ".json")
+
+    def _read(self):
+        path = self._path()
+        if path is None or self.requestFactory.cache.refresh:
+            return
+        try:
+            with open(path, "r") as file:
+                data = json.load(file)
+            self._users = dict(data["users"])
+            self._loaded = data["loaded"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def _write(self):
+        path = self._path()
+        if path is None:
+            return
+        try:
+            Utils.privateDirectory(os.path.dirname(path))
+            with Utils.openPrivate(path + ".tmp") as file:
+                json.dump({"users": self._users, "loaded": self._loaded}, file)
+            os.replace(path + ".tmp", path)
+        except OSError:
+            pass
+
+    def _apiMembers(self):
+        return self.address + "/members/all?per_page={}".format(Paginator.MAX_PER_PAGE)
+
+    def _apiGetUsersByName(self, userName):
+        # the instance endpoint, the project one only knows project users and no username filter
+        return self.requestFactory.config.getApiAddress() + "/users?username={}".format(Utils.encode(userName))
+
+
 class Command(object):
     
-    def __init__(self, gitlab, apis):
-        self.executer = gitlab
-        self.apis = apis
+    def __init__(self, registry):
+        self.registry = registry
+
+    @property
+    def executer(self):
+        return self.registry.executer()
         
     def translate(self, args):
         if len(args) < 2:
-            print("\nNo command given\n")
+            printer.out("\nNo command given\n")
             self.overview()
             return
         c = args[1]
         r = args[2:len(args)]
-        self.mapCommand(c, r)
+        return self.mapCommand(c, r)
     
     def mapCommand(self, command, args):
         if command == "assign":
             assert len(args) >= 2, "assign #issue #username"
-            self.executer.assignToUser(args[0], args[1])
+            self.runBulk(args[0], lambda issueId: self.executer.assignToUser(issueId, args[1]))
         elif command == "unassign":
             assert len(args) >= 1, "unassign #issueId"
-            self.executer.unassignIssue(args[0])
+            self.runBulk(args[0], self.executer.unassignIssue)
         elif command == "mv":
             assert len(args) >= 2, "mv #issue #labelname"
             self.executer.moveToPanel(args[0], args[1])
         elif command == "delready":
             assert len(args) >= 1, "delready #listname"
             self.executer.removeReadyLabel(args[0])
+        elif command == "batch":
+            Batch(self.registry).run(args)
         elif command == "-h" or command == "help":
             self.overview()
         elif self.mapApi(command, args):
-            print("\n")
+            # records end with the last record, a blank line would be an empty csv row
+            if printer.format is None:
+                printer.out("\n")
         else:
             printer.out("Command not supplied: {}\n\n".format(command))
             self.overview()
+            return False
+        return True
 
 
+    def runBulk(self, selection, action):
+        requestFactory = self.executer.requestFactory
+        issueIds = IssueSelection.resolve(requestFactory, self.executer.res.address, selection)
+        if issueIds is not None:
+            BulkRunner(requestFactory).run(issueIds, action)
+
     def mapApi(self, command, args):
-        for api in self.apis:
-            if api.match(command):
-                api.execute(args)
-                return True
-        return False
+        api = self.registry.api(command)
+        if api is None:
+            return False
+        api.execute(args)
+        return True
             
     def overview(self):
         c = "Help\n\n"
         c += "#.. required parameter\n"
         c += "?.. optional parameter\n\n"
         c += "-h/help\n"
+        c += "--no-cache  - do not use the response cache\n"
+        c += "--refresh  - revalidate every cached response\n"
+        c += "--engine=sync|async  - request engine, async overlaps independent requests\n"
+        c += "--trace  - print every request and a timing summary to stderr\n"
+        c += "--offline/--local  - board, issue, mr and pipes read from the mirror written by sync\n"
+        c += "--format=ndjson|csv|json  - list commands print records instead of a table\n"
+        c += "--fields=iid,author.username  - fields of the records\n"
+        c += "--trace-file=path  - write every request and the summary as JSON\n"
+        c += "daemon start|stop|status|run  - keep configuration, connections and caches in a background process\n"
+        c += "batch ?file --parallel ?n  - run one command per line of file or stdin in this process\n"
         c += "assign #issue #username - assign #issue to #username\n"
         c += "unassign #issueId  - unassign all users from #issueId \n"
+        c += "  #issue of assign/unassign/move/lab: 12 / 12,15 / 10-20 / label:name\n"
         c += "mv #issue #labelname  - set #labelname to #issue\n"
         c += "delready #listname  - remove Ready label from list #listname \n"
-        print(c)
-        for api in self.apis:
+        printer.out(c)
+        for api in self.registry.allApis():
             api.help()
 
 
 
+class Batch(object):
+
+    # batch [file]: runs the commands of a file or stdin, one per line with the
+    # same syntax as on the command line, in this process. All lines share the
+    # configuration, the pooled connections and the caches. With --parallel N up
+    # to N lines run at a time; a line "wait" starts the lines below only after
+    # all lines above have finished. The output of each line is printed in line
+    # order, then a table of results and timings.
+
+    def __init__(self, registry):
+        self.registry = registry
+
+    def run(self, args):
+        parallel = 1
+        path = None
+        arguments = iter(args)
+        for arg in arguments:
+            if arg == "--parallel":
+                parallel = int(next(arguments, "1"))
+            elif arg.startswith("--parallel="):
+                parallel = int(arg.replace("--parallel=", ""))
+            else:
+                path = arg
+
+        lines = Batch.read(path)
+        if len(lines) == 0:
+            printer.out("No commands")
+            return
+        # the lines with the batch's own switches find everything built already
+        self.registry.requestFactory()
+
+        started = time.perf_counter()
+        results = []
+        if parallel <= 1:
+            for number, text, tokens in lines:
+                if tokens != ["wait"]:
+                    printer.out("> {}".format(text))
+                    results.append((number, text) + self.runLine(tokens, printer.stdout, printer.stderr))
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers = parallel) as executor:
+                for group in Batch.groups(lines):
+                    futures = [(number, text, executor.submit(self.runBuffered, tokens)) for number, text, tokens in group]
+                    for number, text, future in futures:
+                        result, seconds, output, errors = future.result()
+                        printer.out("> {}".format(text))
+                        if output:
+                            printer.out(output.rstrip("\n"))
+                        if errors:
+                            printer.err(errors)
+                        results.append((number, text, result, seconds))
+
+        rows = [[number, Util.lineBreak(text, 60), result, "{:.3f}".format(seconds)] for number, text, result, seconds in results]
+        printer.out(tabulate(rows, headers = ["line", "command", "result", "seconds"]))
+        failed = len([row for row in rows if row[2] != "ok"])
+        printer.out("{} succeeded, {} failed in {:.3f}s".format(len(rows) - failed, failed, time.perf_counter() - started))
+        if failed > 0:
+            sys.exit(1)
+
+    def read(path):
+        import shlex
+        if path is None or path == "-":
+            text = sys.stdin.read()
+        else:
+            with open(path, "r") as file:
+                text = file.read()
+        lines = []
+        for number, line in enumerate(text.splitlines(), 1):
+            try:
+                tokens = shlex.split(line, comments = True)
+            except ValueError as e:
+                printer.out("Line {}: {}".format(number, e))
+                sys.exit(1)
+            if len(tokens) > 0:
+                lines.append((number, line.strip(), tokens))
+        return lines
+
+    def groups(lines):
+        group = []
+        for line in lines:
+            if line[2] == ["wait"]:
+                yield group
+                group = []
+            else:
+                group.append(line)
+        yield group
+
+    def runBuffered(self, tokens):
+        import io
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        result, seconds = self.runLine(tokens, stdout, stderr)
+        return result, seconds, stdout.getvalue(), stderr.getvalue()
+
+    def runLine(self, tokens, stdout, stderr):
+        options = Options([self.registry.options.args[0]] + tokens)
+        options.inherit(self.registry.options)
+        started = time.perf_counter()
+        result = "ok"
+        printer.capture(stdout, stderr)
+        try:
+            printer.setFormat(options.format, options.fields)
+            if Command(ApiRegistry(options, self.registry.shared)).translate(options.args) is False:
+                result = "unknown command"
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                result = "exit {}".format(e.code)
+        except Exception as e:
+            result = "failed"
+            printer.err("{}: {}\n".format(type(e).__name__, e))
+        finally:
+            printer.release()
+        return result, time.perf_counter() - started
+
+
+class Daemon(object):
+
+    # Optional background process that keeps the configuration, the pooled
+    # connections and the caches between calls. The cli sends its arguments over
+    # a unix socket and prints the output that comes back line by line; without
+    # a daemon, for interactive commands and for "daemon" itself it runs in
+    # process. Calls are served one at a time.
+
+    def socketPath():
+        configFile = os.path.abspath(os.environ.get(ENV_VARIABLE_NAME, "./configuration.json"))
+        directory = os.path.join(os.environ.get("XDG_RUNTIME_DIR") or "/tmp", "gitlab-cli-{}".format(os.getuid()))
+        name = hashlib.sha1(configFile.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(directory, name + ".sock")
+
+    def ownedDirectory(path):
+        import stat
+        try:
+            directory = os.lstat(path)
+        except OSError:
+            return False
+        return stat.S_ISDIR(directory.st_mode) and directory.st_uid == os.getuid() and directory.st_mode & 0o077 == 0
+
+    def ownedPath(path):
+        # /tmp is shared and the name is predictable: only a socket of this user
+        # in a directory no one else can write to is our daemon
+        import stat
+        try:
+            socketFile = os.lstat(path)
+        except OSError:
+            return False
+        return Daemon.ownedDirectory(os.path.dirname(path)) and stat.S_ISSOCK(socketFile.st_mode) and socketFile.st_uid == os.getuid()
+
+    def interactive(args):
+        # mr <iid>, issue -a and pipes -watch need the terminal, batch may read
+        # its commands from stdin
+        args = Options(args).args
+        if len(args) < 2:
+            return False
+        if args[1] == "batch":
+            return True
+        for apiClass in API_CLASSES:
+            if apiClass._command == args[1]:
+                api = apiClass()
+                api.setup(None, None)
+                return api.needsTerminal(args[2:])
+        return False
+
+    def connect():
+        import socket
+        path = Daemon.socketPath()
+        if not Daemon.ownedPath(path):
+            return None
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            connection.connect(path)
+        except OSError:
+            connection.close()
+            return None
+        return connection
+
+    def forward(args):
+        if Daemon.interactive(args):
+            return False
+        connection = Daemon.connect()
+        if connection is None:
+            return False
+        import shutil
+        request = {"args": args, "cwd": os.getcwd(), "tty": sys.stdout.isatty(), "columns": shutil.get_terminal_size().columns}
+        with connection, connection.makefile("rw", encoding = "utf-8") as stream:
+            stream.write(json.dumps(request) + "\n")
+            stream.flush()
+            try:
+                for line in stream:
+                    message = json.loads(line)
+                    if "out" in message:
+                        sys.stdout.write(message["out"])
+                        sys.stdout.flush()
+                    elif "err" in message:
+                        sys.stderr.write(message["err"])
+                        sys.stderr.flush()
+                    elif "exit" in message:
+                        if message["exit"] != 0:
+                            sys.exit(message["exit"])
+                        return True
+            except KeyboardInterrupt:
+                # closing the connection makes the daemon stop the call
+                sys.exit(130)
+        # the daemon went away in the middle of the call
+        sys.exit(1)
+
+    def command(script, args):
+        action = args[0] if len(args) > 0 else "status"
+        if action == "run":
+            Daemon().serve()
+        elif action == "start":
+            Daemon.start(script)
+        elif action in ("stop", "status"):
+            connection = Daemon.connect()
+            if connection is None:
+                printer.out("No daemon running")
+                return
+            with connection, connection.makefile("rw", encoding = "utf-8") as stream:
+                stream.write(json.dumps({action: True}) + "\n")
+                stream.flush()
+                line = stream.readline()
+                printer.out(json.loads(line)["status"] if line else "No daemon running")
+        else:
+            printer.out("daemon start|stop|status|run")
+
+    def start(script):
+        if Daemon.connect() is not None:
+            printer.out("Daemon already running")
+            return
+        import subprocess
+        subprocess.Popen([sys.executable, os.path.abspath(script), "daemon", "run"], start_new_session = True,
+                         stdin = subprocess.DEVNULL, stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL)
+        for i in range(50):
+            if Daemon.connect() is not None:
+                printer.out("Daemon started on {}".format(Daemon.socketPath()))
+                return
+            time.sleep(0.1)
+        printer.out("Daemon did not start")
+
+    def __init__(self):
+        # the daemon has to read the same configuration wherever a call comes from
+        self.configFile = os.path.abspath(os.environ.get(ENV_VARIABLE_NAME, "./configuration.json"))
+        os.environ[ENV_VARIABLE_NAME] = self.configFile
+        self.shared = {}
+        self.configVersion = None
+        self.calls = 0
+        self.started = time.time()
+        self.lock = threading.Lock()
+
+    def serve(self):
+        import socketserver
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                daemon.handle(self.rfile, self.wfile, self.server)
+
+        path = Daemon.socketPath()
+        Utils.privateDirectory(os.path.dirname(path))
+        if not Daemon.ownedDirectory(os.path.dirname(path)) or (os.path.lexists(path) and not Daemon.ownedPath(path)):
+            printer.out("Not serving on {}, it belongs to another user or its directory is not private".format(path))
+            sys.exit(1)
+        if os.path.lexists(path):
+            os.remove(path)
+        os.umask(0o077)
+        server = socketserver.ThreadingUnixStreamServer(path, Handler)
+        server.daemon_threads = True
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            if Daemon.ownedPath(path):
+                os.remove(path)
+
+    def handle(self, rfile, wfile, server):
+        request = json.loads(rfile.readline().decode("utf-8"))
+        gone = threading.Event()
+
+        def send(message):
+            if gone.is_set():
+                raise DaemonClientGone()
+            try:
+                wfile.write((json.dumps(message) + "\n").encode("utf-8"))
+                wfile.flush()
+            except OSError:
+                gone.set()
+                raise DaemonClientGone()
+        if "status" in request or "stop" in request:
+            send({"status": "Daemon pid {}, {} calls, up {:.0f}s".format(os.getpid(), self.calls, time.time() - self.started)})
+            if "stop" in request:
+                threading.Thread(target = server.shutdown).start()
+            return
+
+        # the client sends nothing after its request, the end of its stream means
+        # it went away (Ctrl-C). The call is stopped at its next output.
+        def watchClient():
+            rfile.read()
+            gone.set()
+        threading.Thread(target = watchClient, daemon = True).start()
+
+        with self.lock:
+            self.calls += 1
+            self._reloadChangedConfiguration()
+            printer.redirect(DaemonStream(send, "out"), DaemonStream(send, "err"), request["tty"], request["columns"])
+            code = 0
+            try:
+                os.chdir(request["cwd"])
+                run(request["args"], self.shared)
+            except DaemonClientGone:
+                return
+            except SystemExit as e:
+                code = e.code if isinstance(e.code, int) else 1
+            except BaseException:
+                if gone.is_set():
+                    return
+                import traceback
+                printer.err(traceback.format_exc())
+                code = 1
+            finally:
+                printer.reset()
+            send({"exit": code})
+
+    def _reloadChangedConfiguration(self):
+        try:
+            version = os.stat(self.configFile).st_mtime
+        except OSError:
+            version = None
+        if version != self.configVersion:
+            for value in self.shared.values():
+                if isinstance(value, RequestFactory):
+                    value.close()
+            self.shared = {}
+            self.configVersion = version
+
+
+class DaemonClientGone(Exception):
+    pass
+
+
+class DaemonStream(object):
+
+    # file-like object that sends everything written to it to the client
+
+    def __init__(self, send, kind):
+        self.send = send
+        self.kind = kind
+
+    def write(self, text):
+        if len(text) > 0:
+            self.send({self.kind: text})
+        return len(text)
+
+    def flush(self):
+        pass
+
+
 printer = Printer()
-main(sys.argv)
+tracer = Tracer()
+API_CLASSES = [BranchApi, PipelineApi, BoardApi, IssueMoveApi, IssueApi, MergeRequestApi, LabelsApi, SyncApi]
+
+if __name__ == "__main__":
+    main(sys.argv)